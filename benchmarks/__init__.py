@@ -0,0 +1,18 @@
+"""
+Benchmarks and checks for the CPI generation pipeline.
+
+Run from the repository root: ``python -m benchmarks`` runs the pipeline suite and
+writes a JSON report, ``python -m benchmarks.parse`` and
+``python -m benchmarks.bundle_formats`` run the focused comparisons.
+The checks exit with a non-zero status on failure:
+``python -m benchmarks.deep_processes`` stress-tests 50,000-task chains,
+``python -m benchmarks.parser_backends`` compares the parser backends on the corpus and
+``python -m benchmarks.vectors`` compares generate_vectors with its original loop.
+"""
+import os
+import sys
+
+# The project modules live in sources/ and are imported flat, as in main.ipynb
+SOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sources')
+if SOURCES_DIR not in sys.path:
+    sys.path.append(SOURCES_DIR)
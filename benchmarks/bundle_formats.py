@@ -0,0 +1,67 @@
+"""
+Write time, read time and size of each bundle format and compression level.
+The CPIs of the default sweep for a few x,y pairs are generated once, in memory,
+and then written and read back with every option, so only serialization is timed.
+"""
+import os
+import time
+import tempfile
+
+from generate_cpi import BUNDLE_EXTENSIONS, DEFAULT_CHOICE_DISTRIBUTIONS, DEFAULT_GENERATION_MODES, cpi_seed_sequence
+from generated_processes import get_process_from_file, translate_to_cpi
+from bundle_io import CPIBundleWriter, ColumnarBundleWriter, iter_bundle, bundle_size
+from itertools import product
+import numpy as np
+
+# (format, compression level) pairs; the columnar format is not compressed
+OPTIONS = [
+    ("json", 1), ("json", 6), ("json", 9),
+    ("jsonl", 1), ("jsonl", 6), ("jsonl", 9),
+    ("columnar", None)
+]
+
+def default_sweep_cpis(x, y, seed=0):
+    """Generate the CPIs of the default bundle for x,y as (dicts, CPIArrays)"""
+    dicts, arrays = [], []
+    for z, num_impacts, choice_dist, mode in product(range(1, 11), range(1, 11),
+                                                     DEFAULT_CHOICE_DISTRIBUTIONS, DEFAULT_GENERATION_MODES):
+        rng = np.random.default_rng(cpi_seed_sequence(seed, x, y, z, num_impacts, choice_dist, mode))
+        cpi = translate_to_cpi(get_process_from_file(x, y, z), choice_dist, (1, 10), num_impacts, mode,
+                               rng=rng, as_array=True)
+        cpi.metadata = {'x': x, 'y': y, 'z': z, 'num_impacts': num_impacts, 'choice_distribution': choice_dist,
+                        'generation_mode': mode, 'duration_interval': [1, 10], 'seed': seed}
+        arrays.append(cpi)
+        dicts.append(cpi.to_dict())
+    return dicts, arrays
+
+def main(pairs=((1, 1), (5, 5), (10, 10))):
+    bundles = {(x, y): default_sweep_cpis(x, y) for x, y in pairs}
+    count = sum(len(dicts) for dicts, _ in bundles.values())
+
+    print(f"{count} CPIs from x,y pairs {list(pairs)}")
+    print(f"{'format':<10}{'level':>6}{'write s':>10}{'read s':>10}{'size MB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for format, level in OPTIONS:
+            write_time = read_time = size = 0
+            for (x, y), (dicts, arrays) in bundles.items():
+                path = os.path.join(directory, f"cpi_bundle_x{x}_y{y}{BUNDLE_EXTENSIONS[format]}")
+                start = time.perf_counter()
+                if format == "columnar":
+                    with ColumnarBundleWriter(path) as writer:
+                        for cpi in arrays:
+                            writer.write(cpi)
+                else:
+                    with CPIBundleWriter(path, json_lines=format == "jsonl", compresslevel=level) as writer:
+                        for cpi in dicts:
+                            writer.write(cpi)
+                write_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                for _ in iter_bundle(path):
+                    pass
+                read_time += time.perf_counter() - start
+                size += bundle_size(path)
+            print(f"{format:<10}{level if level is not None else '-':>6}{write_time:>10.2f}{read_time:>10.2f}{size / 1e6:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Stress test of the traversals on very deep processes: left-leaning chains of
+50,000 tasks joined by ',' or '^', written flat and fully parenthesized, go
+through both parser backends, translate_to_cpi, process_metrics and process_to_dot.
+Any of them recursing per nesting level would hit the recursion limit here.
+"""
+import sys
+import time
+
+import numpy as np
+
+from generated_processes import PARSER_BACKENDS, parse_process, clear_parse_cache, translate_to_cpi, process_metrics
+from process_visualization import process_to_dot
+
+
+def chain(num_tasks, operator, parenthesized):
+    """Return the left-leaning chain T1 op T2 op ... of num_tasks tasks"""
+    if not parenthesized:
+        return f' {operator} '.join(f'T{i}' for i in range(1, num_tasks + 1))
+    return '(' * (num_tasks - 1) + 'T1' + ''.join(f' {operator} T{i})' for i in range(2, num_tasks + 1))
+
+
+def preorder(node):
+    """Flatten a compact tree into its pre-order nodes; comparing nested tuples would recurse"""
+    nodes = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node[0] == 'task':
+            nodes.append(node)
+        else:
+            nodes.append(node[0])
+            stack.extend(reversed(node[1:]))
+    return nodes
+
+
+def check_chain(expression, num_tasks, backend):
+    """Run one chain through the pipeline, returning (seconds, problems)"""
+    problems = []
+    start = time.perf_counter()
+    cpi = translate_to_cpi(expression, 0.5, (1, 10), 2, parser_backend=backend, rng=np.random.default_rng(0))
+    metrics = process_metrics(cpi)
+    if metrics['num_tasks'] != num_tasks:
+        problems.append(f"CPI has {metrics['num_tasks']} tasks")
+    if metrics['height'] != num_tasks - 1:
+        problems.append(f"CPI height is {metrics['height']}")
+    if process_metrics(expression, backend=backend)['num_tasks'] != num_tasks:
+        problems.append("process_metrics miscounts the tasks of the expression")
+    dot_nodes = sum('[label=' in line and '->' not in line for line in process_to_dot(cpi).splitlines())
+    if dot_nodes != 2 * num_tasks - 1:
+        problems.append("DOT output is missing nodes")
+    return time.perf_counter() - start, problems
+
+
+def main(num_tasks=50000):
+    failures = 0
+    print(f"Chains of {num_tasks} tasks, recursion limit {sys.getrecursionlimit()}")
+    print(f"{'operator':<10}{'layout':<16}{'backend':<10}{'seconds':>10}")
+    for operator in (',', '^'):
+        for parenthesized in (False, True):
+            expression = chain(num_tasks, operator, parenthesized)
+            layout = 'parenthesized' if parenthesized else 'flat'
+            trees = {}
+            for backend in PARSER_BACKENDS:
+                clear_parse_cache()
+                try:
+                    trees[backend] = preorder(parse_process(expression, backend=backend))
+                    seconds, problems = check_chain(expression, num_tasks, backend)
+                except RecursionError:
+                    seconds, problems = float('nan'), ['RecursionError']
+                print(f"{operator!r:<10}{layout:<16}{backend:<10}{seconds:>10.2f}")
+                for problem in problems:
+                    print(f"  - {problem}")
+                failures += len(problems)
+            if len(trees) == len(PARSER_BACKENDS) and trees[PARSER_BACKENDS[0]] != trees[PARSER_BACKENDS[1]]:
+                print("  - the parser backends disagree")
+                failures += 1
+    if failures:
+        raise SystemExit(f"{failures} problem(s) found")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Per-call parse cost of process expressions: compiling the grammar on every call
+(the old translate_to_cpi behaviour), the shared parser from get_parser(), and
+the recursive-descent backend.
+"""
+import glob
+import time
+
+from lark import Lark
+from generated_processes import PROCESS_GRAMMAR, get_parser
+from process_parser import parse_expression
+
+
+def load_corpus_lines(pattern='generated_processes/generated_processes_full_*.txt'):
+    """Return every process expression in the corpus files matching pattern"""
+    lines = []
+    for filename in sorted(glob.glob(pattern)):
+        with open(filename, 'r') as file:
+            lines.extend(line.strip() for line in file if line.strip())
+    return lines
+
+
+def time_per_call(parse, expressions, repeat=1):
+    """Return the mean seconds per parse call over all expressions"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for expression in expressions:
+            parse(expression)
+    return (time.perf_counter() - start) / (len(expressions) * repeat)
+
+
+def main(sample_size=100):
+    expressions = load_corpus_lines()[:sample_size]
+
+    fresh = time_per_call(lambda s: Lark(PROCESS_GRAMMAR, parser='lalr').parse(s), expressions)
+    shared = time_per_call(get_parser().parse, expressions, repeat=10)
+    descent = time_per_call(parse_expression, expressions, repeat=10)
+
+    print(f"Expressions: {len(expressions)}")
+    print(f"Compile per call: {fresh * 1e3:8.3f} ms/parse")
+    print(f"Shared parser:    {shared * 1e3:8.3f} ms/parse")
+    print(f"Descent parser:   {descent * 1e3:8.3f} ms/parse")
+    print(f"Speedup (shared): {fresh / shared:8.1f}x")
+    print(f"Speedup (descent):{fresh / descent:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Differential check of the parser backends: every line of the corpus files is
+parsed with the shared Lark parser and with the recursive-descent parser, and
+the compact trees must be equal.
+"""
+import glob
+
+from generated_processes import PARSER, tree_to_node
+from process_parser import parse_expression
+
+
+def find_mismatches(pattern='generated_processes/generated_processes_full_*.txt'):
+    """Return (filename, line number, expression) of every line where the backends disagree"""
+    mismatches = []
+    for filename in sorted(glob.glob(pattern)):
+        with open(filename, 'r') as file:
+            for i, line in enumerate(file, 1):
+                expression = line.strip()
+                if not expression:
+                    continue
+                try:
+                    agree = tree_to_node(PARSER.parse(expression)) == parse_expression(expression)
+                except Exception:
+                    agree = False
+                if not agree:
+                    mismatches.append((filename, i, expression))
+    return mismatches
+
+
+def main(pattern='generated_processes/generated_processes_full_*.txt'):
+    mismatches = find_mismatches(pattern)
+    print(f"Corpus files checked: {len(glob.glob(pattern))}")
+    for filename, line, expression in mismatches:
+        print(f"  - {filename}:{line}: {expression}")
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} line(s) where the backends disagree")
+    print("The backends agree on every line")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+Throughput, peak memory and output size of the generation and reading pipeline:
+translate_to_cpi, generate_vectors, generate_cpi_bundle, read_cpi_bundles and
+process_to_dot, on small, medium and large processes of the corpus.
+Every benchmark runs in its own worker process, so its peak RSS is not inflated
+by the benchmarks before it. Results go to a JSON report that can be compared
+with the report of another commit (--compare).
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, tracemalloc is used instead
+    resource = None
+
+from generate_cpi import generate_cpi_bundle, read_cpi_bundles, cpi_seed_sequence
+from generated_processes import get_process_from_file, translate_to_cpi, generate_vectors
+from process_visualization import process_to_dot
+from bundle_io import bundle_size
+
+# Fixture name -> x,y pair of the corpus file its processes come from
+FIXTURES = {'small': (1, 1), 'medium': (5, 5), 'large': (10, 10)}
+
+# Reduced sweep run by the bundle benchmarks: every z, 3 impact sizes, 2 modes, 3 distributions
+SWEEP = dict(
+    z_range=(1, 10),
+    impact_dims_range=(1, 3),
+    generation_modes=['random', 'bagging_remove'],
+    choice_distributions=[0.1, 0.5, 0.9],
+    seed=0
+)
+
+def fixture_combinations():
+    """Return the (z, num_impacts, choice_distribution, mode) combinations of SWEEP"""
+    return list(product(range(SWEEP['z_range'][0], SWEEP['z_range'][1] + 1),
+                        range(SWEEP['impact_dims_range'][0], SWEEP['impact_dims_range'][1] + 1),
+                        SWEEP['choice_distributions'], SWEEP['generation_modes']))
+
+def fixture_cpis(x, y):
+    """Generate the CPI dictionaries of the reduced sweep for x,y in memory"""
+    cpis = []
+    for z, num_impacts, choice_dist, mode in fixture_combinations():
+        rng = np.random.default_rng(cpi_seed_sequence(SWEEP['seed'], x, y, z, num_impacts, choice_dist, mode))
+        cpis.append(translate_to_cpi(get_process_from_file(x, y, z), choice_dist, (1, 10), num_impacts, mode, rng=rng))
+    return cpis
+
+def bench_translate_to_cpi(x, y, directory):
+    """CPIs translated from the corpus processes of x,y"""
+    return len(fixture_cpis(x, y)), None
+
+def bench_generate_vectors(x, y, directory):
+    """Impact vectors drawn for the tasks of every process of x,y, in every mode"""
+    count = 0
+    rng = np.random.default_rng(0)
+    for z in range(1, 11):
+        num_tasks = get_process_from_file(x, y, z).count('T')
+        for mode in ('random', 'bagging_divide', 'bagging_remove_reverse_divide'):
+            count += len(generate_vectors(num_tasks, 10, mode=mode, rng=rng))
+    return count, None
+
+def bench_generate_cpi_bundle(x, y, directory):
+    """CPIs written to a JSON bundle, with the bundle size as output bytes"""
+    path = generate_cpi_bundle(x, y, verbose=False, output_dir=directory, **SWEEP)
+    return len(fixture_combinations()), bundle_size(path)
+
+def bench_read_cpi_bundles(x, y, directory):
+    """CPIs read back from a JSON bundle (written before timing starts)"""
+    return len(read_cpi_bundles(x=x, y=y, bundle_dir=directory)), None
+
+def bench_process_to_dot(x, y, directory):
+    """CPIs rendered to DOT, with the DOT source size as output bytes"""
+    cpis = fixture_cpis(x, y)
+    start = time.perf_counter()
+    size = sum(len(process_to_dot(cpi).encode('utf-8')) for cpi in cpis)
+    return len(cpis), size, time.perf_counter() - start
+
+# Benchmark name -> function returning (items, output bytes or None[, timed seconds])
+BENCHMARKS = {
+    'translate_to_cpi': bench_translate_to_cpi,
+    'generate_vectors': bench_generate_vectors,
+    'generate_cpi_bundle': bench_generate_cpi_bundle,
+    'read_cpi_bundles': bench_read_cpi_bundles,
+    'process_to_dot': bench_process_to_dot
+}
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return tracemalloc.get_traced_memory()[1]
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def run_benchmark(name, fixture, repeat):
+    """Run one benchmark on one fixture (meant to run in a fresh worker process)"""
+    x, y = FIXTURES[fixture]
+    function = BENCHMARKS[name]
+    if resource is None:
+        tracemalloc.start()
+    best = None
+    with tempfile.TemporaryDirectory() as directory:
+        if name == 'read_cpi_bundles':
+            generate_cpi_bundle(x, y, verbose=False, output_dir=directory, **SWEEP)
+        for _ in range(repeat):
+            # Progress bars and summaries would pollute the timings and the console
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                start = time.perf_counter()
+                result = function(x, y, directory)
+                seconds = time.perf_counter() - start
+            items, output_bytes = result[:2]
+            if len(result) > 2:
+                seconds = result[2]
+            best = seconds if best is None else min(best, seconds)
+    return {
+        'benchmark': name,
+        'fixture': fixture,
+        'x': x,
+        'y': y,
+        'items': items,
+        'seconds': best,
+        'items_per_second': items / best if best > 0 else None,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'output_bytes': output_bytes
+    }
+
+def environment():
+    """Describe the interpreter, libraries and commit the report was produced on"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    }
+
+def compare(report, baseline):
+    """Print the throughput of report relative to a baseline report"""
+    previous = {(r['benchmark'], r['fixture']): r for r in baseline['results']}
+    print(f"\n{'benchmark':<22}{'fixture':<8}{'speedup':>9}{'rss ratio':>11}")
+    for result in report['results']:
+        old = previous.get((result['benchmark'], result['fixture']))
+        if old is None or not old['items_per_second'] or not result['items_per_second']:
+            continue
+        speedup = result['items_per_second'] / old['items_per_second']
+        rss = result['peak_rss_bytes'] / old['peak_rss_bytes']
+        print(f"{result['benchmark']:<22}{result['fixture']:<8}{speedup:>9.2f}{rss:>11.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--fixtures', nargs='+', choices=list(FIXTURES), default=list(FIXTURES))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark, the fastest is reported')
+    parser.add_argument('--output', default='benchmark_report.json', help='JSON report path')
+    parser.add_argument('--compare', help='earlier JSON report to compare against')
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'benchmark':<22}{'fixture':<8}{'items':>8}{'items/s':>12}{'peak RSS MB':>13}{'output MB':>11}")
+    for name, fixture in product(args.benchmarks, args.fixtures):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(run_benchmark, name, fixture, args.repeat).result()
+        results.append(result)
+        output = f"{result['output_bytes'] / 1e6:.2f}" if result['output_bytes'] is not None else '-'
+        print(f"{name:<22}{fixture:<8}{result['items']:>8}{result['items_per_second']:>12.1f}"
+              f"{result['peak_rss_bytes'] / 1e6:>13.1f}{output:>11}")
+
+    report = {'environment': environment(), 'repeat': args.repeat, 'results': results}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+    return report
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Statistical check of the batched generate_vectors against the per-vector loop it
+replaced: for every generation mode and dimension both draw the same number of
+vectors and the distribution statistics must agree within a tolerance.
+"""
+import numpy as np
+
+from generate_cpi import DEFAULT_GENERATION_MODES
+from generated_processes import generate_vectors
+
+# Distribution statistics compared between the two implementations
+STATISTICS = {
+    'mean': np.mean,
+    'zero_fraction': lambda values: np.mean(values == 0),
+    'below_0.01': lambda values: np.mean(values < 0.01),
+    'below_0.001': lambda values: np.mean(values < 0.001),
+    'median': np.median
+}
+
+
+def reference_vectors(num_vec, dim, mode, rng):
+    """The per-vector loop generate_vectors replaced"""
+    vectors = []
+    for _ in range(num_vec):
+        vector = rng.random(dim)
+        if mode != "random":
+            indexes = rng.integers(0, dim, size=dim)
+            if mode == "bagging_divide":
+                for i in indexes:
+                    vector[i] /= 10
+            elif mode == "bagging_remove":
+                new_vector = np.zeros(dim)
+                for i in indexes:
+                    new_vector[i] = vector[i]
+                vector = new_vector
+            elif mode == "bagging_remove_divide":
+                new_vector = np.zeros(dim)
+                for i in indexes:
+                    new_vector[i] = vector[i] / 10
+                vector = new_vector
+            elif mode == "bagging_remove_reverse":
+                vector[indexes] = 0
+            elif mode == "bagging_remove_reverse_divide":
+                vector[indexes] = 0
+                non_zero_indexes = np.nonzero(vector)[0]
+                if len(non_zero_indexes) > 0:
+                    for i in rng.choice(non_zero_indexes, size=dim):
+                        vector[i] /= 10
+        vectors.append(vector)
+    return np.array(vectors).reshape(num_vec, dim)
+
+
+def find_mismatches(num_vec=20000, dims=(1, 2, 5, 10), modes=DEFAULT_GENERATION_MODES, tolerance=0.01, seed=0):
+    """Return (mode, dim, statistic, batched value, reference value) of every statistic off by more than tolerance"""
+    mismatches = []
+    for mode in modes:
+        for dim in dims:
+            rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2)]
+            batched = generate_vectors(num_vec, dim, mode=mode, rng=rngs[0])
+            reference = reference_vectors(num_vec, dim, mode, rngs[1])
+            for name, statistic in STATISTICS.items():
+                a, b = float(statistic(batched)), float(statistic(reference))
+                if abs(a - b) > tolerance:
+                    mismatches.append((mode, dim, name, a, b))
+    return mismatches
+
+
+def main(num_vec=20000):
+    mismatches = find_mismatches(num_vec)
+    print(f"Vectors per mode and dimension: {num_vec}")
+    for mode, dim, name, batched, reference in mismatches:
+        print(f"  - {mode}, dim={dim}: {name} {batched:.4f} (batched) vs {reference:.4f} (reference)")
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} statistic(s) differ")
+    print("Every statistic agrees")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,522 @@
+import os
+import re
+import json
+import gzip
+import shutil
+import hashlib
+import numpy as np
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from cpi_array import CPIArray
+from generation_stats import timed_stage
+
+# Whitespace allowed between JSON tokens
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+
+# Uncompressed size after which the writer closes a compressed block
+DEFAULT_BLOCK_SIZE = 1 << 18
+
+# Default gzip compression level of JSON bundles
+DEFAULT_COMPRESSLEVEL = 6
+
+# Version of the sidecar index layout
+INDEX_VERSION = 1
+
+def index_path(bundle_path: str) -> str:
+    """
+    Return the sidecar index path of a bundle:
+    cpi_bundle_x1_y1.cpis.gz -> cpi_bundle_x1_y1.cpis.idx.gz,
+    cpi_bundle_x1_y1.cpis.jsonl.gz -> cpi_bundle_x1_y1.cpis.jsonl.idx.gz
+    """
+    base = bundle_path[:-3] if bundle_path.endswith('.gz') else bundle_path
+    return base + '.idx.gz'
+
+def is_json_lines(path: str) -> bool:
+    """Return True for JSON Lines bundles (.jsonl.gz), False for JSON array bundles"""
+    return path.endswith('.jsonl.gz')
+
+class CPIBundleWriter:
+    """
+    Streams CPIs into a gzip-compressed JSON array, one record at a time, so memory
+    stays constant however large the bundle is. The file is a plain JSON array and
+    can still be loaded with json.load, or streamed back with iter_bundle.
+    With json_lines the file holds one compact JSON record per line instead.
+    
+    Records are grouped into blocks of about block_size bytes and each block is written
+    as its own gzip member; concatenated members are still one valid gzip stream.
+    A sidecar index (see index_path) stores every record's metadata, block and byte span,
+    so filtered reads decompress only the blocks holding matching records.
+    """
+
+    def __init__(self, path: str, json_lines: bool = False, block_size: int = DEFAULT_BLOCK_SIZE,
+                 compresslevel: int = DEFAULT_COMPRESSLEVEL, index: bool = True, stats=None):
+        """
+        Args:
+            path: Destination .cpis.gz (or .cpis.jsonl.gz) file
+            json_lines: Write JSON Lines instead of a JSON array
+            block_size: Uncompressed bytes per compressed block
+            compresslevel: gzip compression level of the blocks (0-9)
+            index: Write the sidecar index when the bundle is closed
+            stats: Optional GenerationStats receiving the encode and compress times
+        """
+        self.path = path
+        self.json_lines = json_lines
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        self.index = index
+        self.stats = stats
+        self.count = 0
+        self._raw = open(path, 'wb')
+        self._offset = 0
+        self._block = bytearray()
+        self._blocks = []
+        self._records = []
+        self._metadata = []
+        # An index left over from a previous bundle at this path would be stale
+        if os.path.exists(index_path(path)):
+            os.remove(index_path(path))
+
+    def write(self, cpi: Dict) -> None:
+        """Serialize one CPI and append it to the bundle"""
+        # Encode first so a record that fails to serialize leaves the stream untouched
+        with timed_stage(self.stats, 'encode'):
+            record = json.dumps(cpi, separators=(',', ':')).encode('utf-8')
+        if self.json_lines:
+            if self.count > 0:
+                self._block += b'\n'
+        else:
+            self._block += b'[\n' if self.count == 0 else b',\n'
+        self._records.append((len(self._blocks), len(self._block), len(record)))
+        self._metadata.append(cpi.get('metadata'))
+        self._block += record
+        self.count += 1
+        if len(self._block) >= self.block_size:
+            self._flush_block()
+
+    def _flush_block(self) -> None:
+        """Compress the pending block as one gzip member and append it to the file"""
+        if not self._block:
+            return
+        # Fixed gzip header timestamp so identical bundles are byte-identical files
+        with timed_stage(self.stats, 'compress'):
+            member = gzip.compress(bytes(self._block), compresslevel=self.compresslevel, mtime=0)
+            self._raw.write(member)
+        self._blocks.append((self._offset, len(member)))
+        self._offset += len(member)
+        self._block = bytearray()
+
+    def close(self) -> None:
+        """Terminate the JSON array, close the file and write the sidecar index"""
+        if self._raw.closed:
+            return
+        if self.json_lines:
+            self._block += b'' if self.count == 0 else b'\n'
+        else:
+            self._block += b'[]\n' if self.count == 0 else b'\n]\n'
+        self._flush_block()
+        self._raw.close()
+        if self.index:
+            index = {
+                'version': INDEX_VERSION,
+                'bundle_size': self._offset,
+                'blocks': self._blocks,
+                'records': self._records,
+                'metadata': self._metadata
+            }
+            with gzip.GzipFile(index_path(self.path), mode='wb', mtime=0) as f:
+                f.write(json.dumps(index, separators=(',', ':')).encode('utf-8'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def load_index(bundle_path: str) -> Optional[Dict]:
+    """
+    Load the sidecar index of a bundle.
+    
+    Returns:
+        Dict: Index with 'blocks', 'records' and 'metadata' lists, or None when the index
+        is missing, of another version, or does not match the bundle on disk
+    """
+    path = index_path(bundle_path)
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, 'rb') as f:
+        index = json.loads(f.read())
+    if index.get('version') != INDEX_VERSION or index.get('bundle_size') != os.path.getsize(bundle_path):
+        return None
+    return index
+
+def _same_value(expected, value):
+    # JSON turns tuples such as duration_interval into lists
+    if isinstance(expected, tuple):
+        expected = list(expected)
+    return value == expected
+
+def metadata_matches(metadata: Optional[Dict], where: Union[Dict, Callable]) -> bool:
+    """
+    Evaluate a metadata filter.
+    
+    Args:
+        metadata: CPI metadata dictionary
+        where: Either a predicate taking the whole metadata dictionary, or a dictionary
+            mapping metadata fields to a required value or to a predicate on that field,
+            e.g. {'generation_mode': 'bagging_remove', 'num_impacts': lambda n: n >= 5}
+    
+    Returns:
+        bool: True if the metadata satisfies the filter
+    """
+    if metadata is None:
+        return False
+    if callable(where):
+        return bool(where(metadata))
+    for field, condition in where.items():
+        if field not in metadata:
+            return False
+        value = metadata[field]
+        if callable(condition):
+            if not condition(value):
+                return False
+        elif not _same_value(condition, value):
+            return False
+    return True
+
+def _iter_indexed(path: str, index: Dict, where) -> Iterator[Dict]:
+    """Yield the records selected by the index, decompressing only the blocks that hold them"""
+    selected = [i for i, metadata in enumerate(index['metadata']) if metadata_matches(metadata, where)]
+    if not selected:
+        return
+    blocks = index['blocks']
+    records = index['records']
+    with open(path, 'rb') as f:
+        current_block, data = None, None
+        for i in selected:
+            block, start, length = records[i]
+            if block != current_block:
+                offset, size = blocks[block]
+                f.seek(offset)
+                data = gzip.decompress(f.read(size))
+                current_block = block
+            yield json.loads(data[start:start + length])
+
+def iter_bundle(path: str, where: Union[Dict, Callable, None] = None, chunk_size: int = 1 << 16,
+                as_array: bool = False) -> Iterator[Union[Dict, CPIArray]]:
+    """
+    Lazily read the CPIs of a .cpis.gz or .cpis.jsonl.gz bundle written by CPIBundleWriter
+    (or json.dump), or of a columnar .cpis bundle directory written by ColumnarBundleWriter.
+    The gzip stream is decoded incrementally, so only one record is held in memory at a time.
+    With a metadata filter and a valid sidecar index, only the blocks holding matching
+    records are decompressed and only matching records are parsed; without an index the
+    bundle is streamed and filtered record by record.
+
+    Args:
+        path: Bundle file path
+        where: Optional metadata filter, see metadata_matches
+        chunk_size: Number of characters read from the stream at a time
+        as_array: Yield CPIArray objects instead of dictionaries
+            (zero-copy views into the mapped columns for columnar bundles)
+
+    Yields:
+        Dict: One CPI dictionary per array element
+
+    Raises:
+        ValueError: If the file is not a JSON array, or its JSON text ends early or is invalid
+        EOFError: If the gzip stream is truncated (e.g. a partial copy)
+        OSError: If the file is not a valid gzip file (gzip.BadGzipFile) or cannot be read
+    """
+    if os.path.isdir(path):
+        bundle = ColumnarBundle(path)
+        positions = range(len(bundle)) if where is None else bundle.select(where)
+        for i in positions:
+            yield bundle[i] if as_array else bundle[i].to_dict()
+        return
+    if as_array:
+        for record in iter_bundle(path, where=where, chunk_size=chunk_size):
+            yield CPIArray.from_dict(record)
+        return
+
+    if where is not None:
+        index = load_index(path)
+        if index is not None:
+            yield from _iter_indexed(path, index, where)
+        else:
+            for record in iter_bundle(path, chunk_size=chunk_size):
+                if metadata_matches(record.get('metadata'), where):
+                    yield record
+        return
+
+    if is_json_lines(path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    decoder = json.JSONDecoder()
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        buffer, pos, eof = '', 0, False
+        read_size = chunk_size
+        expect = 'open'
+
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer) and not eof:
+                # Drop consumed text and refill
+                chunk = f.read(read_size)
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+                continue
+            if pos == len(buffer):
+                raise ValueError(f"Bundle {path} is truncated")
+
+            char = buffer[pos]
+            if expect == 'open':
+                if char != '[':
+                    raise ValueError(f"Bundle {path} does not contain a JSON array")
+                pos += 1
+                expect = 'first'
+            elif expect in ('first', 'separator') and char == ']':
+                return
+            elif expect == 'separator':
+                if char != ',':
+                    raise ValueError(f"Unexpected {char!r} between records of bundle {path}")
+                pos += 1
+                expect = 'value'
+            else:
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                    # A value ending exactly at the buffer end may continue in the next chunk
+                    complete = end < len(buffer) or eof
+                except json.JSONDecodeError:
+                    if eof:
+                        raise ValueError(f"Bundle {path} contains an invalid or truncated record")
+                    complete = False
+                if not complete:
+                    # Read a larger chunk each time the same record is still incomplete
+                    chunk = f.read(read_size)
+                    buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+                    read_size *= 2
+                    continue
+                read_size = chunk_size
+                pos = end
+                expect = 'separator'
+                yield record
+
+# Version of the columnar bundle layout
+COLUMNAR_VERSION = 1
+
+# Column name -> (dtype, trailing shape) of the columnar bundle layout
+COLUMNS = {
+    'node_type': ('int8', ()),
+    'ids': ('int32', ()),
+    'children': ('int32', (2,)),
+    'probability': ('float64', ()),
+    'task_nodes': ('int32', ()),
+    'duration': ('int64', ()),
+    'impacts': ('float64', ()),
+    'node_offsets': ('int64', ()),
+    'task_offsets': ('int64', ()),
+    'impact_offsets': ('int64', ()),
+    'impact_names': ('int32', ())
+}
+
+# Columns with one entry per CPI (offsets have one more), written when the bundle is closed
+PER_CPI_COLUMNS = ('node_offsets', 'task_offsets', 'impact_offsets', 'impact_names')
+
+class ColumnarBundleWriter:
+    """
+    Streams CPIs into a columnar bundle: a directory holding one raw binary file per
+    CPIArray field, concatenated over all CPIs, per-CPI offset and impact name columns,
+    bundle.json with the column schema and the distinct impact name lists, and
+    metadata.json with the per-CPI metadata. Child and task indices are local to their CPI.
+    Readers (ColumnarBundle) memory-map the columns and read metadata.json only when
+    the metadata is used, so opening a bundle is O(1) and a CPI is a set of views into
+    the mapped files.
+    """
+
+    def __init__(self, path: str, stats=None):
+        """
+        Args:
+            path: Destination directory, e.g. CPIs/cpi_bundle_x1_y1.cpis
+            stats: Optional GenerationStats receiving the encode times
+        """
+        self.path = path
+        self.stats = stats
+        self.count = 0
+        os.makedirs(path, exist_ok=True)
+        self._files = {name: open(os.path.join(path, f'{name}.bin'), 'wb') for name in COLUMNS
+                       if name not in PER_CPI_COLUMNS}
+        self._offsets = {'node_offsets': [0], 'task_offsets': [0], 'impact_offsets': [0]}
+        # Distinct impact name lists, and the position of each CPI's list among them
+        self._impact_name_sets = {}
+        self._impact_names = []
+        self._metadata = []
+
+    def write(self, cpi: Union[Dict, CPIArray]) -> None:
+        """Append one CPI, given as a dictionary or as a CPIArray"""
+        with timed_stage(self.stats, 'encode'):
+            if not isinstance(cpi, CPIArray):
+                cpi = CPIArray.from_dict(cpi)
+            for name, file in self._files.items():
+                dtype = COLUMNS[name][0]
+                file.write(np.ascontiguousarray(getattr(cpi, name), dtype=dtype).tobytes())
+        self._offsets['node_offsets'].append(self._offsets['node_offsets'][-1] + cpi.num_nodes)
+        self._offsets['task_offsets'].append(self._offsets['task_offsets'][-1] + cpi.num_tasks)
+        self._offsets['impact_offsets'].append(self._offsets['impact_offsets'][-1] + cpi.impacts.size)
+        self._impact_names.append(self._impact_name_sets.setdefault(tuple(cpi.impact_names),
+                                                                    len(self._impact_name_sets)))
+        self._metadata.append(cpi.metadata)
+        self.count += 1
+
+    def close(self) -> None:
+        """Write the per-CPI columns, bundle.json and metadata.json and close the column files"""
+        if not self._files:
+            return
+        for file in self._files.values():
+            file.close()
+        self._files = {}
+        for name, values in dict(self._offsets, impact_names=self._impact_names).items():
+            np.asarray(values, dtype=COLUMNS[name][0]).tofile(os.path.join(self.path, f'{name}.bin'))
+        with open(os.path.join(self.path, 'metadata.json'), 'w', encoding='utf-8') as f:
+            json.dump(self._metadata, f, separators=(',', ':'))
+        header = {
+            'version': COLUMNAR_VERSION,
+            'count': self.count,
+            'columns': {name: {'dtype': dtype, 'shape': list(shape)} for name, (dtype, shape) in COLUMNS.items()},
+            'impact_name_sets': [list(names) for names in self._impact_name_sets]
+        }
+        with open(os.path.join(self.path, 'bundle.json'), 'w', encoding='utf-8') as f:
+            json.dump(header, f, separators=(',', ':'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class ColumnarBundle:
+    """
+    Read-only view of a columnar bundle written by ColumnarBundleWriter.
+    Columns are memory-mapped on first access; indexing returns a CPIArray whose arrays
+    are views into the mapped files, so no CPI data is copied or parsed. The metadata
+    is only read on first use (metadata, select, or building a CPI).
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Bundle directory
+
+        Raises:
+            ValueError: If the directory holds a bundle of another layout version
+        """
+        self.path = path
+        with open(os.path.join(path, 'bundle.json'), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get('version') != COLUMNAR_VERSION:
+            raise ValueError(f"Unsupported columnar bundle version in {path}")
+        self.count = header['count']
+        self._columns = {}
+        self._metadata = None
+        self._impact_name_sets = [tuple(names) for names in header['impact_name_sets']]
+
+    @property
+    def metadata(self) -> List[Dict]:
+        """Metadata of every CPI, read from metadata.json on first use"""
+        if self._metadata is None:
+            with open(os.path.join(self.path, 'metadata.json'), 'r', encoding='utf-8') as f:
+                self._metadata = json.load(f)
+        return self._metadata
+
+    def impact_names(self, i: int) -> Tuple[str, ...]:
+        """Return the impact names of CPI i"""
+        return self._impact_name_sets[self.column('impact_names')[i]]
+
+    def column(self, name: str) -> np.ndarray:
+        """Return the memory-mapped column concatenated over all CPIs"""
+        if name not in self._columns:
+            dtype, shape = COLUMNS[name]
+            filename = os.path.join(self.path, f'{name}.bin')
+            if os.path.getsize(filename) == 0:
+                array = np.empty((0,) + shape, dtype=dtype)
+            else:
+                array = np.memmap(filename, dtype=dtype, mode='r').reshape((-1,) + shape)
+            self._columns[name] = array
+        return self._columns[name]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i: int) -> CPIArray:
+        if not -self.count <= i < self.count:
+            raise IndexError(f"CPI {i} out of range for a bundle of {self.count}")
+        i %= self.count
+        n0, n1 = self.column('node_offsets')[i:i + 2]
+        t0, t1 = self.column('task_offsets')[i:i + 2]
+        i0, i1 = self.column('impact_offsets')[i:i + 2]
+        return CPIArray(
+            node_type=self.column('node_type')[n0:n1],
+            ids=self.column('ids')[n0:n1],
+            children=self.column('children')[n0:n1],
+            probability=self.column('probability')[n0:n1],
+            task_nodes=self.column('task_nodes')[t0:t1],
+            duration=self.column('duration')[t0:t1],
+            impacts=self.column('impacts')[i0:i1],
+            impact_names=self.impact_names(i),
+            metadata=self.metadata[i]
+        )
+
+    def __iter__(self) -> Iterator[CPIArray]:
+        for i in range(self.count):
+            yield self[i]
+
+    def select(self, where: Union[Dict, Callable]) -> List[int]:
+        """Return the positions of the CPIs whose metadata satisfies where, see metadata_matches"""
+        return [i for i, metadata in enumerate(self.metadata) if metadata_matches(metadata, where)]
+
+def bundle_checksum(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a bundle file, or of a columnar bundle directory (file names and
+    contents in name order). The sidecar index is derived data and not included.
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        filenames = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    else:
+        filenames = [path]
+    for filename in filenames:
+        if filename != path:
+            digest.update(os.path.basename(filename).encode('utf-8') + b'\0')
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def bundle_size(path: str) -> int:
+    """Size in bytes of a bundle file or columnar bundle directory"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+def publish_bundle(staged_path: str, bundle_path: str) -> None:
+    """
+    Move a finished bundle (and its sidecar index) from staged_path into place at bundle_path.
+    Files are renamed atomically, so readers see either the old or the new bundle, never a
+    partial one; staged_path must be on the same filesystem. A columnar directory replaces
+    an existing one through a short rename swap.
+    """
+    if os.path.isdir(staged_path):
+        if os.path.isdir(bundle_path):
+            retired = staged_path + '.old'
+            os.replace(bundle_path, retired)
+            os.replace(staged_path, bundle_path)
+            shutil.rmtree(retired)
+        else:
+            os.replace(staged_path, bundle_path)
+        return
+
+    os.replace(staged_path, bundle_path)
+    if os.path.exists(index_path(staged_path)):
+        os.replace(index_path(staged_path), index_path(bundle_path))
+    elif os.path.exists(index_path(bundle_path)):
+        os.remove(index_path(bundle_path))
@@ -0,0 +1,518 @@
+import numpy as np
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Union
+from cpi_array import CPIArray, TASK, SEQUENCE, PARALLEL, CHOICE, NATURE
+
+# A choice strategy resolves every choice node: None or a bool for all of them,
+# {choice id: decision} or a callable(choice id) -> decision. A decision is True
+# (take the 'true' branch), False (take 'false') or the probability of taking 'true'.
+Strategy = Union[None, bool, float, Dict[int, Union[bool, float]], Callable[[int], Union[bool, float]]]
+
+def _as_array(cpi: Union[Dict, CPIArray]) -> CPIArray:
+    """Return cpi as a CPIArray, converting CPI dictionaries"""
+    return cpi if isinstance(cpi, CPIArray) else CPIArray.from_dict(cpi)
+
+def choice_decision(strategy: Strategy, choice_id: int) -> float:
+    """
+    Resolve one choice node.
+
+    Args:
+        strategy: Choice strategy, see Strategy (None takes every 'true' branch)
+        choice_id: CPI id of the choice node
+
+    Returns:
+        float: Probability of taking the 'true' branch (1.0 or 0.0 for pure decisions)
+
+    Raises:
+        ValueError: If the strategy has no decision for the node or the decision is not in [0, 1]
+    """
+    if strategy is None:
+        return 1.0
+    if callable(strategy):
+        decision = strategy(choice_id)
+    elif isinstance(strategy, dict):
+        if choice_id not in strategy:
+            raise ValueError(f"The strategy has no decision for choice node {choice_id}")
+        decision = strategy[choice_id]
+    else:
+        decision = strategy
+    decision = float(decision)
+    if not 0.0 <= decision <= 1.0:
+        raise ValueError(f"Decision {decision} for choice node {choice_id} is not a probability")
+    return decision
+
+def _node_weights(node_type: np.ndarray, children: np.ndarray, probability: np.ndarray,
+                  ids: np.ndarray, strategy: Strategy) -> np.ndarray:
+    """
+    Probability of executing every node, for n CPIs of the same topology at once.
+    node_type and probability are (n, num_nodes); children and ids are shared.
+    Nodes are in pre-order, so a single forward pass sees every parent before its children.
+    """
+    n, num_nodes = node_type.shape
+    weights = np.empty((n, num_nodes))
+    weights[:, 0] = 1.0
+    decisions = {}
+    for index in range(num_nodes):
+        left, right = children[index]
+        if left < 0:
+            continue
+        weight = weights[:, index]
+        code = node_type[:, index]
+        if code[0] == SEQUENCE or code[0] == PARALLEL:
+            weights[:, left] = weight
+            weights[:, right] = weight
+            continue
+        # XOR node: nature draws with its probability, choices follow the strategy
+        is_choice = code == CHOICE
+        true_probability = probability[:, index]
+        if is_choice.any():
+            if index not in decisions:
+                decisions[index] = choice_decision(strategy, int(ids[index]))
+            true_probability = np.where(is_choice, decisions[index], true_probability)
+        weights[:, left] = weight * true_probability
+        weights[:, right] = weight * (1.0 - true_probability)
+    return weights
+
+def expected_impact(cpi: Union[Dict, CPIArray], strategy: Strategy = None) -> np.ndarray:
+    """
+    Expected impact vector of a CPI: every task's impacts weighted by the probability
+    of executing it, i.e. the product over its XOR ancestors of p or 1 - p for nature
+    nodes and of the strategy's decision for choice nodes.
+
+    Args:
+        cpi: CPI dictionary (as produced by translate_to_cpi) or CPIArray
+        strategy: Choice strategy, see Strategy (None takes every 'true' branch)
+
+    Returns:
+        np.ndarray: Expected value of each impact, in impact_names order
+    """
+    cpi = _as_array(cpi)
+    node_type = cpi.node_type.tolist()
+    probability = cpi.probability.tolist()
+    ids = cpi.ids.tolist()
+
+    # Scalar version of _node_weights: one forward pass over the pre-order nodes
+    weights = [0.0] * cpi.num_nodes
+    weights[0] = 1.0
+    for index, (left, right) in enumerate(cpi.children.tolist()):
+        if left < 0:
+            continue
+        weight = weights[index]
+        code = node_type[index]
+        if code == NATURE:
+            true_probability = probability[index]
+        elif code == CHOICE:
+            true_probability = choice_decision(strategy, ids[index])
+        else:
+            weights[left] = weights[right] = weight
+            continue
+        weights[left] = weight * true_probability
+        weights[right] = weight * (1.0 - true_probability)
+    return np.asarray(weights)[cpi.task_nodes] @ cpi.impacts
+
+def expected_impacts_batch(cpis: Iterable[Union[Dict, CPIArray]], strategy: Strategy = None,
+                           chunk_size: int = 4096) -> List[np.ndarray]:
+    """
+    Expected impact vectors of many CPIs, e.g. a bundle streamed with iter_cpis.
+    CPIs are grouped by topology (tree shape with choice and nature nodes alike) and
+    impact dimension; each group is evaluated with one pass over its nodes and one
+    einsum, instead of one traversal per CPI. The strategy applies to every CPI.
+
+    Args:
+        cpis: CPI dictionaries or CPIArrays
+        strategy: Choice strategy, see Strategy
+        chunk_size: CPIs grouped at a time, bounding memory on long streams
+
+    Returns:
+        List[np.ndarray]: Expected impact vector of each CPI, in input order
+    """
+    results = []
+    chunk = []
+    for cpi in cpis:
+        chunk.append(_as_array(cpi))
+        if len(chunk) >= chunk_size:
+            results.extend(_evaluate_chunk(chunk, strategy))
+            chunk = []
+    if chunk:
+        results.extend(_evaluate_chunk(chunk, strategy))
+    return results
+
+def _topology_groups(chunk: List[CPIArray], by_impacts: bool = True) -> List[List[int]]:
+    """
+    Group the positions of CPIs sharing the same topology (tree shape, ids, and node types
+    with choice and nature alike) and, if by_impacts, the same impact dimension
+    """
+    groups = {}
+    for position, cpi in enumerate(chunk):
+        xor_agnostic = np.where(cpi.node_type == CHOICE, NATURE, cpi.node_type)
+        key = (xor_agnostic.tobytes(), cpi.children.tobytes(), cpi.ids.tobytes(),
+               cpi.impacts.shape[1] if by_impacts else 0)
+        groups.setdefault(key, []).append(position)
+    return list(groups.values())
+
+def _evaluate_chunk(chunk: List[CPIArray], strategy: Strategy) -> List[np.ndarray]:
+    """Evaluate the expected impacts of a list of CPIArrays, grouped by topology"""
+    results = [None] * len(chunk)
+    for positions in _topology_groups(chunk):
+        first = chunk[positions[0]]
+        node_type = np.stack([chunk[p].node_type for p in positions])
+        probability = np.stack([chunk[p].probability for p in positions])
+        impacts = np.stack([chunk[p].impacts for p in positions])
+        weights = _node_weights(node_type, first.children, probability, first.ids, strategy)
+        expected = np.einsum('nt,ntd->nd', weights[:, first.task_nodes], impacts)
+        for row, position in enumerate(positions):
+            results[position] = expected[row]
+    return results
+
+class Scenario(NamedTuple):
+    """
+    One execution scenario of a CPI. Masks are bitmasks over CPI node ids: bit i of
+    resolved_mask is set when XOR node i is reached (and so resolved), bit i of true_mask
+    when it takes its 'true' branch. probability is the product of the nature outcomes
+    (choices contribute 1) and impacts the sum of the impacts of the executed tasks.
+    """
+    true_mask: int
+    resolved_mask: int
+    probability: float
+    impacts: np.ndarray
+
+def pareto_front(points: np.ndarray) -> np.ndarray:
+    """
+    Indices of the rows of points not dominated by another row, minimizing every column:
+    a row is dominated when another is lower or equal everywhere and lower somewhere.
+
+    Returns:
+        np.ndarray: Sorted indices of the non-dominated rows
+    """
+    # Visiting rows by increasing sum, a row can only be dominated by rows already kept
+    order = np.argsort(points.sum(axis=1), kind='stable')
+    kept = []
+    for index in order:
+        point = points[index]
+        if kept:
+            front = points[kept]
+            if np.any(np.all(front <= point, axis=1) & np.any(front < point, axis=1)):
+                continue
+        kept.append(index)
+    return np.sort(np.asarray(kept, dtype=np.intp))
+
+class _Frontier:
+    """Partial scenarios of a region: masks, probabilities (k,) and impacts (k, num_impacts)"""
+
+    __slots__ = ('true_masks', 'resolved_masks', 'probability', 'impacts')
+
+    def __init__(self, true_masks, resolved_masks, probability, impacts):
+        self.true_masks = true_masks
+        self.resolved_masks = resolved_masks
+        self.probability = probability
+        self.impacts = impacts
+
+    def __len__(self):
+        return len(self.true_masks)
+
+    def select(self, indices):
+        return _Frontier([self.true_masks[i] for i in indices], [self.resolved_masks[i] for i in indices],
+                         self.probability[indices], self.impacts[indices])
+
+def _combine(first: _Frontier, second: _Frontier) -> _Frontier:
+    """Cross product of the scenarios of two regions executed together"""
+    true_masks = [a | b for a in first.true_masks for b in second.true_masks]
+    resolved_masks = [a | b for a in first.resolved_masks for b in second.resolved_masks]
+    probability = np.outer(first.probability, second.probability).ravel()
+    impacts = (first.impacts[:, None, :] + second.impacts[None, :, :]).reshape(-1, first.impacts.shape[1])
+    return _Frontier(true_masks, resolved_masks, probability, impacts)
+
+def _branch(frontier: _Frontier, bit: int, taken: bool, probability: float) -> _Frontier:
+    """Scenarios of a region reached through one branch of an XOR node"""
+    true_masks = [mask | bit for mask in frontier.true_masks] if taken else frontier.true_masks
+    resolved_masks = [mask | bit for mask in frontier.resolved_masks]
+    return _Frontier(true_masks, resolved_masks, frontier.probability * probability, frontier.impacts)
+
+def _union(first: _Frontier, second: _Frontier) -> _Frontier:
+    """Scenarios of either of two alternative branches"""
+    return _Frontier(first.true_masks + second.true_masks, first.resolved_masks + second.resolved_masks,
+                     np.concatenate([first.probability, second.probability]),
+                     np.concatenate([first.impacts, second.impacts]))
+
+def _prune(frontier: _Frontier, nature_bits: int) -> _Frontier:
+    """Keep the Pareto-optimal impacts among scenarios with the same nature outcomes"""
+    groups = {}
+    for index, (true_mask, resolved_mask) in enumerate(zip(frontier.true_masks, frontier.resolved_masks)):
+        groups.setdefault((true_mask & nature_bits, resolved_mask & nature_bits), []).append(index)
+    if len(groups) == len(frontier):
+        return frontier
+    kept = []
+    for indices in groups.values():
+        if len(indices) == 1:
+            kept.extend(indices)
+        else:
+            indices = np.asarray(indices)
+            kept.extend(indices[pareto_front(frontier.impacts[indices])].tolist())
+    return frontier.select(sorted(kept))
+
+def iter_scenarios(cpi: Union[Dict, CPIArray], prune: bool = True) -> Iterator[Scenario]:
+    """
+    Lazily enumerate the execution scenarios of a CPI: every way of resolving the nature
+    and choice nodes that are reached, with its probability and accumulated impacts.
+    The scenarios of each region are built bottom-up. With prune, choice resolutions whose
+    impacts are Pareto-dominated by another resolution under the same nature outcomes are
+    dropped in every region below the root (a dominated partial choice can never complete
+    into a non-dominated scenario), which keeps large CPIs tractable. The root's combination
+    of its two children is streamed without being materialized, and without the final
+    pruning step, so a few dominated scenarios may still be yielded.
+
+    Args:
+        cpi: CPI dictionary (as produced by translate_to_cpi) or CPIArray
+        prune: Drop Pareto-dominated choice resolutions; False enumerates every scenario
+
+    Yields:
+        Scenario: (true_mask, resolved_mask, probability, impacts)
+    """
+    cpi = _as_array(cpi)
+    node_type = cpi.node_type.tolist()
+    children = cpi.children.tolist()
+    probability = cpi.probability.tolist()
+    ids = cpi.ids.tolist()
+    task_slot = {node: slot for slot, node in enumerate(cpi.task_nodes.tolist())}
+    nature_bits = 0
+    for index, code in enumerate(node_type):
+        if code == NATURE:
+            nature_bits |= 1 << ids[index]
+
+    # Children always come after their parent in pre-order, so reverse order is bottom-up;
+    # the root is left to the lazy stream below
+    frontiers = [None] * len(node_type)
+    for index in range(len(node_type) - 1, 0, -1):
+        code = node_type[index]
+        if code == TASK:
+            frontiers[index] = _Frontier([0], [0], np.ones(1), cpi.impacts[task_slot[index]][None, :])
+            continue
+        left, right = children[index]
+        first, second = frontiers[left], frontiers[right]
+        frontiers[left] = frontiers[right] = None
+        bit = 1 << ids[index]
+        if code == SEQUENCE or code == PARALLEL:
+            frontier = _combine(first, second)
+        elif code == NATURE:
+            frontier = _union(_branch(first, bit, True, probability[index]),
+                              _branch(second, bit, False, 1.0 - probability[index]))
+        else:
+            frontier = _union(_branch(first, bit, True, 1.0), _branch(second, bit, False, 1.0))
+        frontiers[index] = _prune(frontier, nature_bits) if prune and code != NATURE else frontier
+
+    code = node_type[0]
+    if code == TASK:
+        yield Scenario(0, 0, 1.0, cpi.impacts[0].copy())
+        return
+    first, second = frontiers[children[0][0]], frontiers[children[0][1]]
+    bit = 1 << ids[0]
+    if code == SEQUENCE or code == PARALLEL:
+        for i in range(len(first)):
+            for j in range(len(second)):
+                yield Scenario(first.true_masks[i] | second.true_masks[j],
+                               first.resolved_masks[i] | second.resolved_masks[j],
+                               float(first.probability[i] * second.probability[j]),
+                               first.impacts[i] + second.impacts[j])
+        return
+    true_probability = probability[0] if code == NATURE else 1.0
+    for frontier, taken, branch_probability in ((first, True, true_probability),
+                                                (second, False, 1.0 - true_probability if code == NATURE else 1.0)):
+        for i in range(len(frontier)):
+            yield Scenario(frontier.true_masks[i] | (bit if taken else 0), frontier.resolved_masks[i] | bit,
+                           float(frontier.probability[i] * branch_probability), frontier.impacts[i].copy())
+
+class Makespan(NamedTuple):
+    """
+    Makespan of a CPI. minimum and maximum range over every resolution of the XOR nodes;
+    expected is the mean under the nature probabilities and a choice strategy, and
+    pmf[k] the probability of a makespan of offset + k.
+    """
+    minimum: int
+    maximum: int
+    expected: float
+    offset: int
+    pmf: np.ndarray
+
+def _max_distribution(first_offset, first_pmf, second_offset, second_pmf):
+    """Distribution of the maximum of two independent makespans, via the product of their CDFs"""
+    offset = max(first_offset, second_offset)
+    end = max(first_offset + len(first_pmf), second_offset + len(second_pmf))
+    cdf = np.ones(end - offset)
+    for pmf_offset, pmf in ((first_offset, first_pmf), (second_offset, second_pmf)):
+        values = np.cumsum(pmf)[offset - pmf_offset:]
+        cdf[:len(values)] *= values
+    return offset, np.diff(cdf, prepend=0.0)
+
+def _mixture(first_offset, first_pmf, second_offset, second_pmf, true_probability):
+    """Distribution of the first makespan with probability true_probability, else the second"""
+    offset = min(first_offset, second_offset)
+    pmf = np.zeros(max(first_offset + len(first_pmf), second_offset + len(second_pmf)) - offset)
+    pmf[first_offset - offset:first_offset - offset + len(first_pmf)] += true_probability * first_pmf
+    pmf[second_offset - offset:second_offset - offset + len(second_pmf)] += (1.0 - true_probability) * second_pmf
+    return offset, pmf
+
+def makespan(cpi: Union[Dict, CPIArray], strategy: Strategy = None) -> Makespan:
+    """
+    Compute the makespan of a CPI in one bottom-up traversal: a sequence lasts the sum of
+    its children, a parallel the longest child and an XOR the branch it takes. Alongside the
+    bounds, the exact makespan distribution is propagated as integer-valued pmf arrays
+    (convolution for sequences, product of CDFs for parallels, mixtures for XOR nodes).
+
+    Args:
+        cpi: CPI dictionary (as produced by translate_to_cpi) or CPIArray
+        strategy: Choice strategy for the expected makespan, see Strategy
+
+    Returns:
+        Makespan: (minimum, maximum, expected, offset, pmf)
+    """
+    cpi = _as_array(cpi)
+    node_type = cpi.node_type.tolist()
+    children = cpi.children.tolist()
+    probability = cpi.probability.tolist()
+    ids = cpi.ids.tolist()
+    duration = cpi.duration.tolist()
+    task_slot = {node: slot for slot, node in enumerate(cpi.task_nodes.tolist())}
+
+    minimum = [0] * len(node_type)
+    maximum = [0] * len(node_type)
+    distribution = [None] * len(node_type)
+    # Children always come after their parent in pre-order, so reverse order is bottom-up
+    for index in range(len(node_type) - 1, -1, -1):
+        code = node_type[index]
+        if code == TASK:
+            minimum[index] = maximum[index] = duration[task_slot[index]]
+            distribution[index] = (minimum[index], np.ones(1))
+            continue
+        left, right = children[index]
+        first, second = distribution[left], distribution[right]
+        distribution[left] = distribution[right] = None
+        if code == SEQUENCE:
+            minimum[index] = minimum[left] + minimum[right]
+            maximum[index] = maximum[left] + maximum[right]
+            distribution[index] = (first[0] + second[0], np.convolve(first[1], second[1]))
+        elif code == PARALLEL:
+            minimum[index] = max(minimum[left], minimum[right])
+            maximum[index] = max(maximum[left], maximum[right])
+            distribution[index] = _max_distribution(*first, *second)
+        else:
+            minimum[index] = min(minimum[left], minimum[right])
+            maximum[index] = max(maximum[left], maximum[right])
+            true_probability = probability[index] if code == NATURE else choice_decision(strategy, ids[index])
+            distribution[index] = _mixture(*first, *second, true_probability)
+
+    offset, pmf = distribution[0]
+    expected = float(np.arange(offset, offset + len(pmf)) @ pmf)
+    return Makespan(minimum[0], maximum[0], expected, offset, pmf)
+
+def _convolve_rows(first: np.ndarray, second: np.ndarray, length: int) -> np.ndarray:
+    """Row-wise convolution of two pmf matrices through the FFT, truncated to length columns"""
+    size = first.shape[1] + second.shape[1] - 1
+    product = np.fft.rfft(first, size, axis=1) * np.fft.rfft(second, size, axis=1)
+    # Round-off leaves tiny negative values where the pmf is zero
+    return np.clip(np.fft.irfft(product, size, axis=1)[:, :length], 0.0, None)
+
+def _makespan_group(group: List[CPIArray], strategy: Strategy) -> np.ndarray:
+    """
+    Minimum, maximum and expected makespan of CPIs sharing one topology, as an (n, 3) array.
+    Same recurrences as makespan, with one column per CPI for the bounds and one pmf row
+    per CPI (indexed from makespan 0) for the distribution.
+    """
+    first_cpi = group[0]
+    node_type = np.stack([cpi.node_type for cpi in group])
+    probability = np.stack([cpi.probability for cpi in group])
+    duration = np.stack([cpi.duration for cpi in group])
+    children = first_cpi.children.tolist()
+    ids = first_cpi.ids.tolist()
+    task_slot = {node: slot for slot, node in enumerate(first_cpi.task_nodes.tolist())}
+    num_nodes = first_cpi.num_nodes
+    rows = np.arange(len(group))
+
+    # Bounds first: they size the pmf rows of every node
+    minimum = np.zeros((num_nodes, len(group)), dtype=np.int64)
+    maximum = np.zeros((num_nodes, len(group)), dtype=np.int64)
+    for index in range(num_nodes - 1, -1, -1):
+        left, right = children[index]
+        code = node_type[0, index]
+        if left < 0:
+            minimum[index] = maximum[index] = duration[:, task_slot[index]]
+        elif code == SEQUENCE:
+            minimum[index] = minimum[left] + minimum[right]
+            maximum[index] = maximum[left] + maximum[right]
+        elif code == PARALLEL:
+            minimum[index] = np.maximum(minimum[left], minimum[right])
+            maximum[index] = np.maximum(maximum[left], maximum[right])
+        else:
+            minimum[index] = np.minimum(minimum[left], minimum[right])
+            maximum[index] = np.maximum(maximum[left], maximum[right])
+
+    distribution = [None] * num_nodes
+    for index in range(num_nodes - 1, -1, -1):
+        left, right = children[index]
+        code = node_type[0, index]
+        length = int(maximum[index].max()) + 1
+        if left < 0:
+            pmf = np.zeros((len(group), length))
+            pmf[rows, duration[:, task_slot[index]]] = 1.0
+            distribution[index] = pmf
+            continue
+        first, second = distribution[left], distribution[right]
+        distribution[left] = distribution[right] = None
+        if code == SEQUENCE:
+            distribution[index] = _convolve_rows(first, second, length)
+        elif code == PARALLEL:
+            cdf = np.ones((len(group), length))
+            cdf[:, :first.shape[1]] *= np.cumsum(first, axis=1)
+            cdf[:, :second.shape[1]] *= np.cumsum(second, axis=1)
+            distribution[index] = np.diff(cdf, axis=1, prepend=0.0)
+        else:
+            is_choice = node_type[:, index] == CHOICE
+            true_probability = probability[:, index]
+            if is_choice.any():
+                true_probability = np.where(is_choice, choice_decision(strategy, ids[index]), true_probability)
+            pmf = np.zeros((len(group), length))
+            pmf[:, :first.shape[1]] += true_probability[:, None] * first
+            pmf[:, :second.shape[1]] += (1.0 - true_probability[:, None]) * second
+            distribution[index] = pmf
+
+    pmf = distribution[0]
+    expected = pmf @ np.arange(pmf.shape[1])
+    return np.column_stack([minimum[0], maximum[0], expected])
+
+def makespans_batch(cpis: Iterable[Union[Dict, CPIArray]], strategy: Strategy = None,
+                    chunk_size: int = 4096) -> Dict[str, np.ndarray]:
+    """
+    Minimum, maximum and expected makespan of many CPIs, e.g. read_cpi_bundles output or
+    an iter_cpis stream. CPIs are grouped by topology and each group is evaluated with
+    one pass over its nodes on (CPIs x makespan) arrays, sequences being convolved
+    through the FFT.
+
+    Args:
+        cpis: CPI dictionaries or CPIArrays
+        strategy: Choice strategy for the expected makespan, see Strategy
+        chunk_size: CPIs grouped at a time, bounding memory on long streams
+
+    Returns:
+        Dict[str, np.ndarray]: 'minimum', 'maximum' (int64) and 'expected' (float64)
+            arrays, one entry per CPI in input order
+    """
+    results = []
+    chunk = []
+    for cpi in cpis:
+        chunk.append(_as_array(cpi))
+        if len(chunk) >= chunk_size:
+            results.append(_makespan_chunk(chunk, strategy))
+            chunk = []
+    if chunk or not results:
+        results.append(_makespan_chunk(chunk, strategy))
+    values = np.concatenate(results)
+    return {
+        'minimum': values[:, 0].astype(np.int64),
+        'maximum': values[:, 1].astype(np.int64),
+        'expected': values[:, 2]
+    }
+
+def _makespan_chunk(chunk: List[CPIArray], strategy: Strategy) -> np.ndarray:
+    """Evaluate the makespans of a list of CPIArrays, grouped by topology, as an (n, 3) array"""
+    values = np.zeros((len(chunk), 3))
+    for positions in _topology_groups(chunk, by_impacts=False):
+        values[positions] = _makespan_group([chunk[p] for p in positions], strategy)
+    return values
@@ -0,0 +1,152 @@
+import numpy as np
+
+# Node type codes; the code of a type is its position in NODE_TYPES
+NODE_TYPES = ('task', 'sequence', 'parallel', 'choice', 'nature')
+TASK, SEQUENCE, PARALLEL, CHOICE, NATURE = range(len(NODE_TYPES))
+TYPE_CODES = {name: code for code, name in enumerate(NODE_TYPES)}
+
+# Dictionary keys of the two children of each non-task node type
+CHILD_KEYS = {
+    SEQUENCE: ('head', 'tail'),
+    PARALLEL: ('first_split', 'second_split'),
+    CHOICE: ('true', 'false'),
+    NATURE: ('true', 'false')
+}
+
+class CPIArray:
+    """
+    Struct-of-arrays representation of a CPI.
+    Nodes are stored in pre-order (parents before children, first child subtree before
+    the second), tasks in the same order:
+        node_type   int8   (num_nodes,)          type code, see NODE_TYPES
+        ids         int32  (num_nodes,)          CPI id of each node
+        children    int32  (num_nodes, 2)        node index of each child, -1 for tasks
+        probability float64 (num_nodes,)         nature probability, NaN for other nodes
+        task_nodes  int32  (num_tasks,)          node index of each task
+        duration    int64  (num_tasks,)          task durations
+        impacts     float64 (num_tasks, num_impacts) task impact vectors
+    impact_names holds the impact keys ('impact_1', ...) and metadata the optional
+    bundle metadata. Conversion to and from the nested dictionary format is lossless.
+    """
+
+    __slots__ = ('node_type', 'ids', 'children', 'probability', 'task_nodes', 'duration',
+                 'impacts', 'impact_names', 'metadata')
+
+    def __init__(self, node_type, ids, children, probability, task_nodes, duration, impacts,
+                 impact_names, metadata=None):
+        self.node_type = np.asarray(node_type, dtype=np.int8)
+        self.ids = np.asarray(ids, dtype=np.int32)
+        self.children = np.asarray(children, dtype=np.int32).reshape(-1, 2)
+        self.probability = np.asarray(probability, dtype=np.float64)
+        self.task_nodes = np.asarray(task_nodes, dtype=np.int32)
+        self.duration = np.asarray(duration, dtype=np.int64)
+        self.impacts = np.asarray(impacts, dtype=np.float64).reshape(len(self.task_nodes), len(impact_names))
+        self.impact_names = tuple(impact_names)
+        self.metadata = metadata
+
+    @property
+    def num_nodes(self):
+        return len(self.node_type)
+
+    @property
+    def num_tasks(self):
+        return len(self.task_nodes)
+
+    def __len__(self):
+        return self.num_nodes
+
+    @classmethod
+    def from_dict(cls, cpi):
+        """
+        Build the array representation of a CPI dictionary.
+
+        Args:
+            cpi (dict): CPI as produced by translate_to_cpi, optionally with 'metadata'
+
+        Returns:
+            CPIArray: Equivalent array representation
+
+        Raises:
+            ValueError: If the tasks do not share the same impact keys
+        """
+        node_type, ids, children, probability = [], [], [], []
+        task_nodes, duration, impacts = [], [], []
+        impact_names = None
+
+        stack = [(cpi, -1, 0)]
+        while stack:
+            region, parent, side = stack.pop()
+            index = len(node_type)
+            if parent >= 0:
+                children[parent][side] = index
+            code = TYPE_CODES[region['type']]
+            node_type.append(code)
+            ids.append(region['id'])
+            children.append([-1, -1])
+            probability.append(region['probability'] if code == NATURE else np.nan)
+            if code == TASK:
+                names = tuple(region['impacts'])
+                if impact_names is None:
+                    impact_names = names
+                elif names != impact_names:
+                    raise ValueError(f"Task {region['id']} has impact keys {names}, expected {impact_names}")
+                task_nodes.append(index)
+                duration.append(region['duration'])
+                impacts.append(list(region['impacts'].values()))
+            else:
+                first_key, second_key = CHILD_KEYS[code]
+                # Second child pushed first so the first subtree is numbered first
+                stack.append((region[second_key], index, 1))
+                stack.append((region[first_key], index, 0))
+
+        impact_names = impact_names or ()
+        return cls(node_type, ids, children, probability, task_nodes, duration,
+                   np.array(impacts, dtype=np.float64).reshape(len(task_nodes), len(impact_names)),
+                   impact_names, cpi.get('metadata'))
+
+    def to_dict(self):
+        """
+        Rebuild the nested CPI dictionary, with the same keys and key order as translate_to_cpi.
+
+        Returns:
+            dict: CPI dictionary, with 'metadata' appended when present
+        """
+        node_type = self.node_type.tolist()
+        ids = self.ids.tolist()
+        children = self.children.tolist()
+        probability = self.probability.tolist()
+        duration = self.duration.tolist()
+        impacts = self.impacts.tolist()
+        task_slot = {node: slot for slot, node in enumerate(self.task_nodes.tolist())}
+
+        built = [None] * len(node_type)
+        # Children always come after their parent in pre-order, so reverse order is bottom-up
+        for index in range(len(node_type) - 1, -1, -1):
+            code = node_type[index]
+            if code == TASK:
+                slot = task_slot[index]
+                built[index] = {
+                    "type": "task",
+                    "id": ids[index],
+                    "duration": duration[slot],
+                    "impacts": dict(zip(self.impact_names, impacts[slot]))
+                }
+                continue
+
+            left, right = children[index]
+            first_key, second_key = CHILD_KEYS[code]
+            result = {
+                "type": NODE_TYPES[code],
+                "id": ids[index],
+                first_key: built[left],
+                second_key: built[right]
+            }
+            if code == NATURE:
+                result["probability"] = probability[index]
+            built[index] = result
+            built[left] = built[right] = None
+
+        root = built[0]
+        if self.metadata is not None:
+            root['metadata'] = self.metadata
+        return root
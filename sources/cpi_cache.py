@@ -0,0 +1,146 @@
+import os
+import json
+import gzip
+import hashlib
+import tempfile
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# Default size bound of the cache folder
+DEFAULT_CACHE_BYTES = 1 << 30
+
+# Bump when the cached record layout changes, so old entries are never read back
+CACHE_VERSION = 1
+
+class CPICache:
+    """
+    Content-addressed on-disk cache of generated CPIs.
+    An entry's key is the SHA-256 of everything that determines the CPI: the process
+    string (hashed), num_impacts, choice_distribution, generation mode, duration_interval
+    and the CPI's seed sequence (entropy and spawn key, see cpi_seed_sequence). Only seeded
+    CPIs are cacheable, since unseeded ones are meant to differ on every run.
+    Entries are gzip-compressed compact JSON files sharded by the first two hex digits
+    of the key (cache/ab/abcd....json.gz) and written atomically, so pool workers can share
+    a cache. Reads refresh the entry's mtime; evict removes the least recently used entries
+    until the folder fits in max_bytes.
+    The object only holds its settings, so it is cheap to pickle into worker processes.
+    """
+
+    def __init__(self, directory: str = os.path.join('CPIs', 'cache'), max_bytes: int = DEFAULT_CACHE_BYTES):
+        """
+        Args:
+            directory: Cache folder
+            max_bytes: Size bound enforced by evict
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(
+        process_str: str,
+        num_impacts: int,
+        choice_distribution: float,
+        mode: str,
+        duration_interval: Tuple[int, int],
+        seed_sequence: np.random.SeedSequence
+    ) -> str:
+        """
+        Compute the cache key of a seeded CPI.
+
+        Returns:
+            str: Hex SHA-256 key
+        """
+        parameters = [
+            CACHE_VERSION,
+            hashlib.sha256(process_str.encode('utf-8')).hexdigest(),
+            num_impacts,
+            choice_distribution,
+            mode,
+            list(duration_interval),
+            str(seed_sequence.entropy),
+            [int(k) for k in seed_sequence.spawn_key]
+        ]
+        encoded = json.dumps(parameters, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def path(self, key: str) -> str:
+        """Return the file of an entry"""
+        return os.path.join(self.directory, key[:2], f'{key}.json.gz')
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Load a cached CPI dictionary and mark it as recently used.
+
+        Returns:
+            Dict: The cached CPI, or None on a miss (or an unreadable entry)
+        """
+        path = self.path(key)
+        try:
+            with gzip.open(path, 'rb') as f:
+                cpi = json.loads(f.read())
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return cpi
+
+    def put(self, key: str, cpi: Dict) -> None:
+        """Store a CPI dictionary (without metadata) under key"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = gzip.compress(json.dumps(cpi, separators=(',', ':')).encode('utf-8'), compresslevel=1, mtime=0)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def _entries(self):
+        """List (mtime, size, path) of every entry"""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json.gz'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self) -> int:
+        """Total size in bytes of the cached entries"""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            int: Number of removed entries
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        for _, _, path in self._entries():
+            os.remove(path)
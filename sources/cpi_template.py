@@ -0,0 +1,88 @@
+import numpy as np
+from generated_processes import parse_process, generate_vectors, DEFAULT_PARSER_BACKEND
+from cpi_array import CPIArray, TASK, SEQUENCE, PARALLEL, CHOICE, NATURE
+
+# CPIArray type code of each compact parse tree kind; XOR nodes become choice or nature per sample
+KIND_CODES = {'task': TASK, 'sequential': SEQUENCE, 'parallel': PARALLEL, 'xor': CHOICE}
+
+class CPITemplate:
+    """
+    Compile-once, sample-many CPI generator for a fixed process expression.
+    The parse tree is walked once to record its topology as CPIArray columns (pre-order
+    node types, child indices, task and XOR positions); every sample then only draws
+    durations, impacts, choice/nature flags and probabilities with a few batched NumPy calls.
+    Samples have exactly the shape of translate_to_cpi output (same ids, keys and key order),
+    but consume the generator in a different order, so equal seeds give different values.
+    """
+
+    def __init__(self, process_str, parser_backend=DEFAULT_PARSER_BACKEND):
+        """
+        Args:
+            process_str (str): Process string following the grammar in PROCESS_GRAMMAR
+            parser_backend (str): Parser backend, one of PARSER_BACKENDS
+        """
+        self.process_str = process_str
+        tree = parse_process(process_str, parser_backend)
+
+        # Pre-order traversal: the position of a node in these lists is its CPI id
+        node_type = []
+        children = []
+        stack = [(tree, -1, 0)]
+        while stack:
+            node, parent, side = stack.pop()
+            index = len(node_type)
+            if parent >= 0:
+                children[parent][side] = index
+            node_type.append(KIND_CODES[node[0]])
+            children.append([-1, -1])
+            if node[0] != 'task':
+                # Right child pushed first so the left subtree is numbered first
+                stack.append((node[2], index, 1))
+                stack.append((node[1], index, 0))
+
+        self.node_type = np.array(node_type, dtype=np.int8)
+        self.children = np.array(children, dtype=np.int32).reshape(-1, 2)
+        self.task_nodes = np.flatnonzero(self.node_type == TASK).astype(np.int32)
+        self.xor_nodes = np.flatnonzero(self.node_type == CHOICE)
+        self.num_nodes = len(node_type)
+        self.num_tasks = len(self.task_nodes)
+        self.num_xors = len(self.xor_nodes)
+
+    def sample(self, n, choice_distribution, duration_interval, num_impacts, vector_generation_mode="random", rng=None,
+               as_array=False):
+        """
+        Draw n CPI instances of the template.
+
+        Args:
+            n (int): Number of instances
+            choice_distribution (float): Probability of XOR node becoming a choice (vs nature)
+            duration_interval (tuple): (min, max) duration for tasks
+            num_impacts (int): Number of impact keys per task
+            vector_generation_mode (str): Mode for generating impact vectors
+            rng (np.random.Generator): Source of all randomness, a freshly seeded generator if None
+            as_array (bool): Return CPIArray objects instead of dictionaries
+
+        Returns:
+            list: n CPI process dictionaries, as produced by translate_to_cpi (or CPIArrays)
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+
+        durations = rng.integers(duration_interval[0], duration_interval[1] + 1, size=(n, self.num_tasks))
+        impacts = generate_vectors(n * self.num_tasks, num_impacts, mode=vector_generation_mode, rng=rng)
+        impacts = impacts.reshape(n, self.num_tasks, num_impacts)
+        is_choice = rng.random((n, self.num_xors)) < choice_distribution
+        probabilities = rng.random((n, self.num_xors))
+
+        ids = np.arange(self.num_nodes, dtype=np.int32)
+        impact_names = [f"impact_{i+1}" for i in range(num_impacts)]
+        cpis = []
+        for k in range(n):
+            node_type = self.node_type.copy()
+            node_type[self.xor_nodes] = np.where(is_choice[k], CHOICE, NATURE)
+            probability = np.full(self.num_nodes, np.nan)
+            probability[self.xor_nodes] = np.where(is_choice[k], np.nan, probabilities[k])
+            cpi = CPIArray(node_type, ids, self.children, probability, self.task_nodes, durations[k],
+                           impacts[k], impact_names)
+            cpis.append(cpi if as_array else cpi.to_dict())
+        return cpis
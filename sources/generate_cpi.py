@@ -1,10 +1,20 @@
 import os
 import json
-import gzip
-from generated_processes import get_process_from_file, translate_to_cpi
+import zlib
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from generated_processes import CORPUS, get_process_from_file, translate_to_cpi, DEFAULT_PARSER_BACKEND
+from bundle_io import (CPIBundleWriter, ColumnarBundleWriter, iter_bundle, bundle_checksum, bundle_size,
+                       publish_bundle, DEFAULT_COMPRESSLEVEL)
+from cpi_array import CPIArray
+from cpi_cache import CPICache
+from generation_stats import GenerationStats, stage_clock
 from tqdm import tqdm
 from itertools import product
-from typing import List, Tuple, Dict, Union, Optional
+from typing import List, Tuple, Dict, Union, Optional, Iterator, Callable
 
 DEFAULT_GENERATION_MODES = [
     "random",
@@ -17,33 +27,194 @@ DEFAULT_GENERATION_MODES = [
 
 DEFAULT_CHOICE_DISTRIBUTIONS = [round(i/10, 1) for i in range(1, 10)]  # 0.1 to 0.9
 
+# Bundle file extension of each bundle format
+BUNDLE_EXTENSIONS = {
+    "json": ".cpis.gz",         # gzip-compressed compact JSON array of CPI dictionaries
+    "jsonl": ".cpis.jsonl.gz",  # gzip-compressed JSON Lines, one CPI dictionary per line
+    "columnar": ".cpis"         # binary: directory of memory-mappable CPIArray columns
+}
+
+# Resolution at which a choice distribution enters a CPI's seed spawn key
+CHOICE_KEY_SCALE = 10**6
+
+# Sweep manifest recording the finished bundles of an output folder
+MANIFEST_FILENAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+def cpi_seed_sequence(
+    seed: int,
+    x: int,
+    y: int,
+    z: int,
+    num_impacts: int,
+    choice_distribution: float,
+    mode: str
+) -> np.random.SeedSequence:
+    """
+    Derive the independent seed sequence of a single CPI from the sweep seed.
+    The child is built like SeedSequence.spawn does, but its spawn key is made of the
+    CPI parameters instead of a running counter, so any CPI can be regenerated in
+    isolation and the result does not depend on which other combinations are generated.
+    
+    Args:
+        seed: Sweep seed (root entropy)
+        x, y, z: Process coordinates in the corpus
+        num_impacts: Number of impact dimensions
+        choice_distribution: Probability of XOR nodes becoming choices
+        mode: Impact vector generation mode
+    
+    Returns:
+        np.random.SeedSequence: Seed sequence for the CPI's generator
+    """
+    spawn_key = (
+        x, y, z, num_impacts,
+        round(choice_distribution * CHOICE_KEY_SCALE),
+        zlib.crc32(mode.encode('utf-8'))
+    )
+    return np.random.SeedSequence(seed, spawn_key=spawn_key)
+
+def regenerate_cpi(
+    x: int,
+    y: int,
+    z: int,
+    num_impacts: int,
+    choice_distribution: float,
+    mode: str,
+    seed: int,
+    duration_interval: Tuple[int, int] = (1, 10),
+    parser_backend: str = DEFAULT_PARSER_BACKEND
+) -> Dict:
+    """
+    Regenerate one CPI of a seeded sweep without replaying the rest of the sweep.
+    
+    Returns:
+        Dict: CPI dictionary identical to the one in the bundle, without metadata
+    """
+    rng = np.random.default_rng(cpi_seed_sequence(seed, x, y, z, num_impacts, choice_distribution, mode))
+    return translate_to_cpi(
+        process_str=get_process_from_file(x, y, z),
+        choice_distribution=choice_distribution,
+        duration_interval=duration_interval,
+        num_impacts=num_impacts,
+        vector_generation_mode=mode,
+        parser_backend=parser_backend,
+        rng=rng
+    )
+
+def list_cpi_bundles(
+    bundle_pattern: Optional[str] = None,
+    x: Optional[int] = None,
+    y: Optional[int] = None,
+    bundle_dir: str = 'CPIs',
+    format: Optional[str] = None
+) -> List[str]:
+    """
+    List the bundle filenames selected by the read_cpi_bundles filters.
+    A bundle stored in several formats is listed once, in the first of its formats
+    in BUNDLE_EXTENSIONS order, unless format selects one.
+    
+    Args:
+        bundle_pattern: Optional pattern to match specific bundle files (e.g., "x1_y*")
+        x: Optional specific x value to load
+        y: Optional specific y value to load
+        bundle_dir: Folder holding the bundles
+        format: Optional bundle format to list, one of BUNDLE_EXTENSIONS
+    
+    Returns:
+        List[str]: Bundle filenames (or columnar bundle directories) relative to bundle_dir
+    """
+    if format is not None and format not in BUNDLE_EXTENSIONS:
+        raise ValueError(f"Unknown bundle format {format!r}, expected one of {list(BUNDLE_EXTENSIONS)}")
+    extensions = [BUNDLE_EXTENSIONS[format]] if format is not None else list(BUNDLE_EXTENSIONS.values())
+    if x is not None and y is not None:
+        names = [f"cpi_bundle_x{x}_y{y}{extension}" for extension in extensions]
+        existing = [name for name in names if os.path.exists(os.path.join(bundle_dir, name))]
+        return existing[:1] or names[:1]
+    
+    # Bundle name without extension -> (format precedence, filename)
+    bundles = {}
+    for f in os.listdir(bundle_dir):
+        if bundle_pattern and bundle_pattern not in f:
+            continue
+        for precedence, extension in enumerate(extensions):
+            if f.endswith(extension):
+                stem = f[:-len(extension)]
+                if stem not in bundles or precedence < bundles[stem][0]:
+                    bundles[stem] = (precedence, f)
+                break
+    return [filename for _, filename in bundles.values()]
+
+def iter_cpis(
+    bundle_pattern: Optional[str] = None,
+    x: Optional[int] = None,
+    y: Optional[int] = None,
+    bundle_dir: str = 'CPIs',
+    where: Union[Dict, Callable, None] = None,
+    as_array: bool = False,
+    format: Optional[str] = None
+) -> Iterator[Union[Dict, CPIArray]]:
+    """
+    Lazily yield CPI dictionaries from all matching bundle files, one at a time.
+    Bundles are decoded incrementally, so a full-corpus scan runs in bounded memory.
+    A bundle that fails to read is reported and skipped after the CPIs already yielded from it.
+    
+    Args:
+        bundle_pattern: Optional pattern to match specific bundle files (e.g., "x1_y*")
+        x: Optional specific x value to load
+        y: Optional specific y value to load
+        bundle_dir: Folder holding the bundles
+        where: Optional filter on the CPI metadata (z, num_impacts, choice_distribution,
+            generation_mode, duration_interval, ...), see bundle_io.metadata_matches.
+            Bundles with a sidecar index only decompress and parse the matching records.
+        as_array: Yield CPIArray objects; for columnar bundles these are zero-copy views
+            into the memory-mapped columns
+        format: Only read bundles of this format; by default a bundle stored in several
+            formats is read once, see list_cpi_bundles
+        
+    Yields:
+        Dict: CPI dictionaries in bundle order
+    """
+    for filename in list_cpi_bundles(bundle_pattern, x, y, bundle_dir, format):
+        filepath = os.path.join(bundle_dir, filename)
+        if not os.path.exists(filepath):
+            continue
+        try:
+            yield from iter_bundle(filepath, where=where, as_array=as_array)
+        except (ValueError, OSError, EOFError) as e:
+            print(f"Error reading bundle {filename}: {str(e)}")
+
 def read_cpi_bundles(
     bundle_pattern: Optional[str] = None,
     x: Optional[int] = None,
-    y: Optional[int] = None
-) -> List[Dict]:
+    y: Optional[int] = None,
+    where: Union[Dict, Callable, None] = None,
+    bundle_dir: str = 'CPIs',
+    as_array: bool = False,
+    format: Optional[str] = None
+) -> List[Union[Dict, CPIArray]]:
     """
     Read compressed CPI bundles from files and return a list of CPI dictionaries.
+    Use iter_cpis instead when the selected bundles do not fit in memory.
     
     Args:
         bundle_pattern: Optional pattern to match specific bundle files (e.g., "x1_y*")
         x: Optional specific x value to load
         y: Optional specific y value to load
+        where: Optional filter on the CPI metadata, e.g.
+            {'generation_mode': 'bagging_remove', 'num_impacts': lambda n: n >= 5}
+        bundle_dir: Folder holding the bundles
+        as_array: Return CPIArray objects; for columnar bundles these are zero-copy views
+            into the memory-mapped columns
+        format: Only read bundles of this format; by default a bundle stored in several
+            formats is read once, see list_cpi_bundles
         
     Returns:
-        List of CPI dictionaries from all matching bundle files
+        List of CPI dictionaries (or CPIArrays) from all matching bundle files
     """
-    bundle_dir = 'CPIs'
     all_cpis = []
     
     # Get list of files to process
-    if x is not None and y is not None:
-        files = [f"cpi_bundle_x{x}_y{y}.cpis.gz"]
-    elif bundle_pattern:
-        files = [f for f in os.listdir(bundle_dir) 
-                if f.endswith('.cpis.gz') and bundle_pattern in f]
-    else:
-        files = [f for f in os.listdir(bundle_dir) if f.endswith('.cpis.gz')]
+    files = list_cpi_bundles(bundle_pattern, x, y, bundle_dir, format)
     
     # Process each file
     with tqdm(total=len(files), desc="Reading CPI bundles") as pbar:
@@ -51,9 +222,7 @@ def read_cpi_bundles(
             try:
                 filepath = os.path.join(bundle_dir, filename)
                 if os.path.exists(filepath):
-                    with gzip.open(filepath, 'rt', encoding='utf-8') as f:
-                        bundle_data = json.load(f)
-                        all_cpis.extend(bundle_data)
+                    all_cpis.extend(iter_bundle(filepath, where=where, as_array=as_array))
             except Exception as e:
                 print(f"Error reading bundle {filename}: {str(e)}")
             pbar.update(1)
@@ -61,6 +230,132 @@ def read_cpi_bundles(
     print(f"\nRead {len(all_cpis)} CPIs from {len(files)} bundle files")
     return all_cpis
 
+def plan_z_values(x: int, y: int, z_range: Tuple[int, int]) -> Tuple[List[int], List[int]]:
+    """
+    Split z_range into the z values that have a process in the corpus file for x,y
+    and those that do not, using the corpus line index instead of failed lookups.
+    
+    Returns:
+        Tuple[List[int], List[int]]: (available z values, missing z values)
+    """
+    try:
+        num_processes = CORPUS.num_processes(x, y)
+    except FileNotFoundError:
+        num_processes = 0
+    z_values = range(z_range[0], z_range[1] + 1)
+    available = [z for z in z_values if 1 <= z <= num_processes]
+    missing = [z for z in z_values if not 1 <= z <= num_processes]
+    return available, missing
+
+def bundle_parameters_hash(x: int, y: int, **bundle_kwargs) -> str:
+    """
+    SHA-256 of everything that determines a bundle's content: x, y and the
+    generate_cpi_bundle parameters (ranges, modes, distributions, parser backend,
+    seed, format, compresslevel). Tuples and lists hash alike.
+    """
+    parameters = dict(bundle_kwargs, x=x, y=y)
+    parameters.pop('output_dir', None)
+    parameters.pop('verbose', None)
+    parameters.pop('cache', None)
+    parameters.pop('dump_stats', None)
+    encoded = json.dumps(parameters, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def bundle_processes_hash(x: int, y: int, z_range: Tuple[int, int]) -> str:
+    """
+    SHA-256 of the corpus processes a bundle is built from: the process string of
+    every z in z_range found in the corpus file for x,y. Regenerating or extending
+    the file changes the hash.
+    """
+    z_values, _ = plan_z_values(x, y, z_range)
+    processes = [[z, get_process_from_file(x, y, z)] for z in z_values]
+    encoded = json.dumps(processes, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def load_manifest(output_dir: str = 'CPIs') -> Dict:
+    """
+    Load the sweep manifest of an output folder.
+    
+    Returns:
+        Dict: {'version': ..., 'bundles': {bundle filename: entry}}, empty if the
+            manifest is missing, unreadable or of another version
+    """
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        manifest = {'version': MANIFEST_VERSION, 'bundles': {}}
+    return manifest
+
+def save_manifest(manifest: Dict, output_dir: str = 'CPIs') -> None:
+    """Write the sweep manifest atomically: to a temporary file, then renamed over the old one"""
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, prefix='.manifest-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(temp_path, os.path.join(output_dir, MANIFEST_FILENAME))
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def remove_staging_directories(output_dir: str = 'CPIs') -> None:
+    """Remove the staging folders and manifest temporaries left in output_dir by killed runs"""
+    for entry in os.scandir(output_dir):
+        if entry.name.startswith('.staging-') and entry.is_dir():
+            shutil.rmtree(entry.path, ignore_errors=True)
+        elif entry.name.startswith('.manifest-') and entry.name.endswith('.tmp'):
+            os.remove(entry.path)
+
+def is_bundle_current(entry: Optional[Dict], bundle_path: str, parameters_hash: str, processes_hash: str) -> bool:
+    """
+    Check a manifest entry against the bundle on disk: same parameters, same corpus
+    processes, same size and same checksum. Any mismatch means the bundle is missing,
+    partial or stale.
+    """
+    if not entry or entry.get('parameters_hash') != parameters_hash or not os.path.exists(bundle_path):
+        return False
+    if entry.get('processes_hash') != processes_hash:
+        return False
+    return entry.get('size') == bundle_size(bundle_path) and entry.get('checksum') == bundle_checksum(bundle_path)
+
+def _generate_checked_bundle(x: int, y: int, bundle_kwargs: Dict, verbose: bool, collect_stats: bool = False) -> Dict:
+    """
+    Generate one bundle and return its manifest entry (runs in pool workers too),
+    with the bundle's GenerationStats as a dictionary under 'stats' if collect_stats
+    and the messages of its failed combinations under 'errors'. 'complete' tells whether
+    every z in z_range had a corpus process. The cache is left
+    to the sweep to evict; the bundle's cache hits and misses are returned, since
+    a worker only updates its own copy of the cache.
+    """
+    stats = GenerationStats() if collect_stats else None
+    errors = []
+    # Hashed before generating, so a corpus file changed meanwhile leaves the entry stale
+    processes_hash = bundle_processes_hash(x, y, bundle_kwargs['z_range'])
+    complete = not plan_z_values(x, y, bundle_kwargs['z_range'])[1]
+    cache = bundle_kwargs['cache']
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    bundle_path = generate_cpi_bundle(x=x, y=y, verbose=verbose, stats=stats, errors=errors, evict_cache=False,
+                                      **bundle_kwargs)
+    if cache is not None:
+        hits, misses = cache.hits - hits, cache.misses - misses
+    return {
+        'stats': stats.to_dict() if stats is not None else None,
+        'errors': errors,
+        'cache_hits': hits,
+        'cache_misses': misses,
+        'complete': complete,
+        'x': x,
+        'y': y,
+        'path': bundle_path,
+        'parameters_hash': bundle_parameters_hash(x, y, **bundle_kwargs),
+        'processes_hash': processes_hash,
+        'size': bundle_size(bundle_path),
+        'checksum': bundle_checksum(bundle_path)
+    }
+
 def generate_cpi_files_parametrized(
     x_range: Tuple[int, int] = (1, 10),
     y_range: Tuple[int, int] = (1, 10),
@@ -68,8 +363,19 @@ def generate_cpi_files_parametrized(
     impact_dims_range: Tuple[int, int] = (1, 10),
     generation_modes: List[str] = None,
     duration_interval: Tuple[int, int] = (1, 10),
-    choice_distributions: List[float] = None
-) -> List[str]:
+    choice_distributions: List[float] = None,
+    parser_backend: str = DEFAULT_PARSER_BACKEND,
+    seed: Optional[int] = None,
+    workers: int = 1,
+    format: str = "json",
+    compresslevel: int = DEFAULT_COMPRESSLEVEL,
+    output_dir: str = 'CPIs',
+    resume: bool = True,
+    cache: Optional[CPICache] = None,
+    stats: Optional[GenerationStats] = None,
+    dump_stats: bool = False,
+    return_stats: bool = False
+) -> Union[List[str], Tuple[List[str], GenerationStats]]:
     """
     Generate compressed .cpis bundle files for each x,y combination within specified ranges.
     Uses generate_cpi_bundle for each x,y pair.
@@ -82,9 +388,28 @@ def generate_cpi_files_parametrized(
         generation_modes: List of generation modes to use, default all available modes
         duration_interval: Tuple of (min_duration, max_duration), default (1, 10)
         choice_distributions: List of probabilities for choice vs nature nodes, default [0.1, ..., 0.9]
+        parser_backend: Process parser backend, 'lark' (default) or 'descent'
+        seed: Optional sweep seed; every CPI then draws from its own generator
+            (see cpi_seed_sequence) and bundles are reproducible, serially or in parallel
+        workers: Number of worker processes generating bundles concurrently,
+            1 (default) generates serially in this process, 0 uses one worker per CPU core
+        format: Bundle format, one of BUNDLE_EXTENSIONS (see generate_cpi_bundle)
+        compresslevel: gzip compression level (0-9) of the JSON formats
+        output_dir: Folder receiving the bundles
+        resume: Skip bundles that the output folder's manifest (see MANIFEST_FILENAME)
+            records as finished with the same parameters and whose checksum still matches;
+            False regenerates every bundle. Bundles with failed combinations or z values
+            missing from the corpus are not recorded, so they are always regenerated,
+            and a bundle whose corpus processes changed is regenerated too
+        cache: Optional CPICache shared by all bundles, see generate_cpi_bundle
+        stats: Optional GenerationStats accumulating the per-stage times of every bundle
+            generated in this run, including those of worker processes
+        dump_stats: Write each bundle's stage times next to it, see generate_cpi_bundle
+        return_stats: Also return the run's GenerationStats (stats, or new stats if None)
     
     Returns:
-        List[str]: List of generated bundle filenames
+        List[str]: List of generated (or already up-to-date) bundle filenames,
+            or (filenames, stats) if return_stats
     """
     # Set default values if not provided
     if generation_modes is None:
@@ -92,45 +417,147 @@ def generate_cpi_files_parametrized(
     
     if choice_distributions is None:
         choice_distributions = DEFAULT_CHOICE_DISTRIBUTIONS
+    
+    if return_stats and stats is None:
+        stats = GenerationStats()
 
-    ensure_directory('CPIs')
+    ensure_directory(output_dir)
+    remove_staging_directories(output_dir)
     generated_bundles = []
     errors = []
     
     # Create combinations for x,y pairs
-    xy_combinations = product(
+    xy_combinations = list(product(
         range(x_range[0], x_range[1] + 1),
         range(y_range[0], y_range[1] + 1)
-    )
+    ))
     
     # Calculate total number of x,y pairs
-    total_xy_pairs = (x_range[1] - x_range[0] + 1) * (y_range[1] - y_range[0] + 1)
+    total_xy_pairs = len(xy_combinations)
     
-    # Main generation loop with tqdm for x,y pairs
-    with tqdm(total=total_xy_pairs, desc="Generating CPI bundles") as pbar:
+    bundle_kwargs = dict(
+        z_range=z_range,
+        impact_dims_range=impact_dims_range,
+        generation_modes=generation_modes,
+        duration_interval=duration_interval,
+        choice_distributions=choice_distributions,
+        parser_backend=parser_backend,
+        seed=seed,
+        format=format,
+        compresslevel=compresslevel,
+        output_dir=output_dir,
+        cache=cache,
+        dump_stats=dump_stats
+    )
+    
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    
+    # Bundles finished by an earlier run with the same parameters are kept as they are
+    manifest = load_manifest(output_dir)
+    skipped = set()
+    if resume:
         for x, y in xy_combinations:
-            try:
-                # Use generate_cpi_bundle for each x,y pair
-                bundle_path = generate_cpi_bundle(
-                    x=x,
-                    y=y,
-                    z_range=z_range,
-                    impact_dims_range=impact_dims_range,
-                    generation_modes=generation_modes,
-                    duration_interval=duration_interval,
-                    choice_distributions=choice_distributions
-                )
-                generated_bundles.append(os.path.basename(bundle_path))
+            filename = f"cpi_bundle_x{x}_y{y}{BUNDLE_EXTENSIONS[format]}"
+            if is_bundle_current(manifest['bundles'].get(filename), os.path.join(output_dir, filename),
+                                 bundle_parameters_hash(x, y, **bundle_kwargs),
+                                 bundle_processes_hash(x, y, z_range)):
+                skipped.add((x, y))
+    pending = [xy for xy in xy_combinations if xy not in skipped]
+    
+    completed = set()
+    
+    def record(entry):
+        """Store a finished bundle's entry and return its failed combinations"""
+        bundle_stats = entry.pop('stats')
+        if stats is not None:
+            stats.merge(bundle_stats)
+        bundle_errors = entry.pop('errors')
+        del entry['cache_hits'], entry['cache_misses']
+        complete = entry.pop('complete')
+        # Checkpoint after every bundle, so an interrupted sweep resumes from here;
+        # a bundle missing failed combinations or corpus processes is left out,
+        # so a resume regenerates it
+        filename = os.path.basename(entry.pop('path'))
+        if bundle_errors or not complete:
+            manifest['bundles'].pop(filename, None)
+        else:
+            manifest['bundles'][filename] = entry
+        save_manifest(manifest, output_dir)
+        completed.add((entry['x'], entry['y']))
+        return bundle_errors
+    
+    # Main generation loop with tqdm for x,y pairs
+    with tqdm(total=total_xy_pairs, initial=len(skipped), desc="Generating CPI bundles") as pbar:
+        if workers <= 1:
+            for x, y in pending:
+                try:
+                    # Use generate_cpi_bundle for each x,y pair
+                    errors.extend(record(_generate_checked_bundle(x, y, bundle_kwargs, True, stats is not None)))
+                    
+                except Exception as e:
+                    error_msg = f"Error processing bundle for x={x}, y={y}: {str(e)}"
+                    errors.append(error_msg)
                 
-            except Exception as e:
-                error_msg = f"Error processing bundle for x={x}, y={y}: {str(e)}"
-                errors.append(error_msg)
+                pbar.update(1)
+        else:
+            # Fan the x,y pairs out over a process pool; workers stay quiet and
+            # the parent owns the progress bar and the error list
+            bundle_errors = {}
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(_generate_checked_bundle, x, y, bundle_kwargs, False, stats is not None): (x, y)
+                    for x, y in pending
+                }
+                for future in as_completed(futures):
+                    x, y = futures[future]
+                    try:
+                        entry = future.result()
+                        if cache is not None:
+                            # Workers count hits and misses on their own copy of the cache
+                            cache.hits += entry['cache_hits']
+                            cache.misses += entry['cache_misses']
+                        bundle_errors[(x, y)] = record(entry)
+                    except Exception as e:
+                        bundle_errors[(x, y)] = [f"Error processing bundle for x={x}, y={y}: {str(e)}"]
+                    pbar.update(1)
             
-            pbar.update(1)
+            # Report errors in the same x,y order as the serial path
+            for xy in pending:
+                errors.extend(bundle_errors.get(xy, []))
+    
+    # Bundles leave the cache to the sweep, which trims it once
+    if cache is not None:
+        cache.evict()
+    
+    # Report bundles in x,y order, finished earlier or in this run
+    for x, y in xy_combinations:
+        if (x, y) in skipped or (x, y) in completed:
+            generated_bundles.append(f"cpi_bundle_x{x}_y{y}{BUNDLE_EXTENSIONS[format]}")
+    
+    # Combinations without a process in the corpus, counted once for the whole sweep
+    per_z = (
+        (impact_dims_range[1] - impact_dims_range[0] + 1)
+        * len(choice_distributions)
+        * len(generation_modes)
+    )
+    pruned = {xy: plan_z_values(*xy, z_range)[1] for xy in pending}
+    pruned = {xy: missing for xy, missing in pruned.items() if missing}
     
     # Print final statistics and errors
     print(f"\nGeneration complete!")
-    print(f"Total bundles generated: {len(generated_bundles)}")
+    print(f"Total bundles generated: {len(completed)}")
+    if skipped:
+        print(f"Up-to-date bundles skipped: {len(skipped)}")
+    if cache is not None:
+        print(f"Cache hits: {cache.hits}, misses: {cache.misses}")
+    if stats is not None and completed:
+        print(f"\nTime per stage:\n{stats}")
+    if pruned:
+        print(f"Combinations skipped for lack of a corpus process: "
+              f"{sum(len(missing) for missing in pruned.values()) * per_z}")
+        for (x, y), missing in pruned.items():
+            print(f"- x={x}, y={y}: z={format_ranges(missing)}")
     if errors:
         print(f"\nErrors encountered ({len(errors)}):")
         for error in errors:
@@ -141,6 +568,8 @@ def generate_cpi_files_parametrized(
             f.write('\n'.join(errors))
         print(f"\nErrors have been saved to 'generation_errors.log'")
     
+    if return_stats:
+        return generated_bundles, stats
     return generated_bundles
 
 def generate_cpi_bundle(
@@ -150,11 +579,23 @@ def generate_cpi_bundle(
     impact_dims_range: Tuple[int, int] = (1, 10),
     generation_modes: List[str] = None,
     duration_interval: Tuple[int, int] = (1, 10),
-    choice_distributions: List[float] = None
+    choice_distributions: List[float] = None,
+    parser_backend: str = DEFAULT_PARSER_BACKEND,
+    seed: Optional[int] = None,
+    verbose: bool = True,
+    format: str = "json",
+    compresslevel: int = DEFAULT_COMPRESSLEVEL,
+    output_dir: str = 'CPIs',
+    cache: Optional[CPICache] = None,
+    stats: Optional[GenerationStats] = None,
+    dump_stats: bool = False,
+    errors: Optional[List[str]] = None,
+    evict_cache: bool = True
 ) -> str:
     """
     Generate a bundle of CPIs for a specific x,y combination with all other parameter combinations.
-    Saves the bundle as a compressed JSON file with .cpis.gz extension.
+    Streams the bundle to disk one CPI at a time, by default as a compressed JSON file
+    with .cpis.gz extension.
     
     Args:
         x: Fixed x value
@@ -164,10 +605,33 @@ def generate_cpi_bundle(
         generation_modes: List of generation modes (defaults to all available modes)
         duration_interval: Task duration interval
         choice_distributions: List of choice probabilities (defaults to [0.1, ..., 0.9])
+        parser_backend: Process parser backend, 'lark' (default) or 'descent'
+        seed: Optional sweep seed, see cpi_seed_sequence
+        verbose: Show the progress bar and print errors and a summary (disabled in pool workers)
+        format: "json" for a .cpis.gz compact JSON array, "jsonl" for .cpis.jsonl.gz JSON Lines,
+            or "columnar" for a .cpis directory of memory-mappable arrays
+            (read back as zero-copy CPIArray views)
+        compresslevel: gzip compression level (0-9) of the JSON formats
+        output_dir: Folder receiving the bundle
+        cache: Optional CPICache (e.g. CPICache('CPIs/cache')); with a seed, CPIs found in
+            the cache are reused instead of regenerated and new ones are added to it,
+            so overlapping sweeps only compute their new combinations
+        stats: Optional GenerationStats receiving the wall/CPU time and counts of the
+            lookup, parse, vectors, build, encode and compress stages of this bundle
+        dump_stats: Also write the bundle's stage times to
+            cpi_bundle_x{x}_y{y}.{format}.stats.json in output_dir
+        errors: Optional list receiving a message for every combination that failed
+            and is missing from the bundle
+        evict_cache: Trim the cache to its max_bytes once the bundle is written;
+            generate_cpi_files_parametrized passes False and trims it once per sweep
     
     Returns:
         str: Path to the generated bundle file
     """
+    if format not in BUNDLE_EXTENSIONS:
+        raise ValueError(f"Unknown bundle format {format!r}, expected one of {list(BUNDLE_EXTENSIONS)}")
+    columnar = format == "columnar"
+
     # Set default values if not provided
     if generation_modes is None:
         generation_modes = DEFAULT_GENERATION_MODES
@@ -175,68 +639,137 @@ def generate_cpi_bundle(
     if choice_distributions is None:
         choice_distributions = DEFAULT_CHOICE_DISTRIBUTIONS
     
-    # Generate all CPIs for this x,y combination
-    cpi_bundle = []
+    # Per-bundle stats, added to the caller's stats at the end
+    if cache is not None:
+        cache_hits, cache_misses = cache.hits, cache.misses
+    bundle_stats = GenerationStats() if stats is not None or dump_stats else None
+    
+    # Only z values with a process in the corpus are planned; the rest are reported once
+    clock = stage_clock(bundle_stats)
+    z_values, missing_z = plan_z_values(x, y, z_range)
+    processes = {z: get_process_from_file(x, y, z) for z in z_values}
+    clock.lap('lookup', len(z_values))
+    per_z = (
+        (impact_dims_range[1] - impact_dims_range[0] + 1)
+        * len(choice_distributions)
+        * len(generation_modes)
+    )
     
     # Create all combinations except x,y
     combinations = product(
-        range(z_range[0], z_range[1] + 1),
+        z_values,
         range(impact_dims_range[0], impact_dims_range[1] + 1),
         choice_distributions,
         generation_modes
     )
     
-    total_combinations = (
-        (z_range[1] - z_range[0] + 1)
-        * (impact_dims_range[1] - impact_dims_range[0] + 1)
-        * len(choice_distributions)
-        * len(generation_modes)
-    )
+    total_combinations = len(z_values) * per_z
+    
+    # Each CPI is written to the bundle as soon as it is generated, into a staging
+    # folder first; the finished bundle is then renamed into place in one step
+    ensure_directory(output_dir)
+    bundle_filename = f"cpi_bundle_x{x}_y{y}{BUNDLE_EXTENSIONS[format]}"
+    bundle_path = os.path.join(output_dir, bundle_filename)
+    staging_dir = tempfile.mkdtemp(dir=output_dir, prefix='.staging-')
+    staged_path = os.path.join(staging_dir, bundle_filename)
+    if columnar:
+        writer = ColumnarBundleWriter(staged_path, stats=bundle_stats)
+    else:
+        writer = CPIBundleWriter(staged_path, json_lines=format == "jsonl", compresslevel=compresslevel,
+                                 stats=bundle_stats)
     
     # Main generation loop with tqdm
-    with tqdm(total=total_combinations, desc=f"Generating CPI bundle for x={x}, y={y}") as pbar:
-        for z, num_impacts, choice_dist, mode in combinations:
-            try:
-                process_str = get_process_from_file(x, y, z)
-                cpi_dict = translate_to_cpi(
-                    process_str=process_str,
-                    choice_distribution=choice_dist,
-                    duration_interval=duration_interval,
-                    num_impacts=num_impacts,
-                    vector_generation_mode=mode
-                )
+    try:
+        with writer, \
+                tqdm(total=total_combinations, desc=f"Generating CPI bundle for x={x}, y={y}", disable=not verbose) as pbar:
+            for z, num_impacts, choice_dist, mode in combinations:
+                try:
+                    process_str = processes[z]
+                    rng = None
+                    cache_key = None
+                    cpi = None
+                    if seed is not None:
+                        seed_sequence = cpi_seed_sequence(seed, x, y, z, num_impacts, choice_dist, mode)
+                        rng = np.random.default_rng(seed_sequence)
+                        if cache is not None:
+                            cache_key = cache.key(process_str, num_impacts, choice_dist, mode,
+                                                  duration_interval, seed_sequence)
+                            cpi = cache.get(cache_key)
+                            if cpi is not None and columnar:
+                                cpi = CPIArray.from_dict(cpi)
+                    if cpi is None:
+                        cpi = translate_to_cpi(
+                            process_str=process_str,
+                            choice_distribution=choice_dist,
+                            duration_interval=duration_interval,
+                            num_impacts=num_impacts,
+                            vector_generation_mode=mode,
+                            parser_backend=parser_backend,
+                            rng=rng,
+                            as_array=columnar,
+                            stats=bundle_stats
+                        )
+                        if cache_key is not None:
+                            cache.put(cache_key, cpi.to_dict() if columnar else cpi)
+                    
+                    # Add metadata to the CPI
+                    metadata = {
+                        'x': x,
+                        'y': y,
+                        'z': z,
+                        'num_impacts': num_impacts,
+                        'choice_distribution': choice_dist,
+                        'generation_mode': mode,
+                        'duration_interval': duration_interval,
+                        'seed': seed
+                    }
+                    if columnar:
+                        cpi.metadata = metadata
+                    else:
+                        cpi['metadata'] = metadata
+                    
+                    writer.write(cpi)
                 
-                # Add metadata to the CPI
-                cpi_dict['metadata'] = {
-                    'x': x,
-                    'y': y,
-                    'z': z,
-                    'num_impacts': num_impacts,
-                    'choice_distribution': choice_dist,
-                    'generation_mode': mode,
-                    'duration_interval': duration_interval
-                }
+                except Exception as e:
+                    error_msg = (f"Error processing x={x}, y={y}, z={z}, num_impacts={num_impacts}, "
+                                 f"choice_dist={choice_dist}, mode={mode}: {str(e)}")
+                    if errors is not None:
+                        errors.append(error_msg)
+                    if verbose:
+                        print(error_msg)
                 
-                cpi_bundle.append(cpi_dict)
-            
-            except Exception as e:
-                print(f"Error processing z={z}, num_impacts={num_impacts}, choice_dist={choice_dist}, mode={mode}: {str(e)}")
-            
-            pbar.update(1)
+                pbar.update(1)
+        publish_bundle(staged_path, bundle_path)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    if cache is not None and evict_cache:
+        cache.evict()
+    if dump_stats:
+        bundle_stats.dump(os.path.join(output_dir, f"cpi_bundle_x{x}_y{y}.{format}.stats.json"),
+                          extra={'bundle': bundle_filename, 'cpis': writer.count})
+    if stats is not None:
+        stats.merge(bundle_stats)
     
-    # Save the bundle as compressed file with .cpis.gz extension
-    ensure_directory('CPIs')
-    bundle_filename = f"cpi_bundle_x{x}_y{y}.cpis.gz"
-    bundle_path = os.path.join('CPIs', bundle_filename)
-    
-    with gzip.open(bundle_path, 'wt', encoding='utf-8') as f:
-        json.dump(cpi_bundle, f, indent=2)
-    
-    print(f"\nBundle generation complete! Saved to {bundle_path}")
-    print(f"Total CPIs in bundle: {len(cpi_bundle)}")
+    if verbose:
+        print(f"\nBundle generation complete! Saved to {bundle_path}")
+        print(f"Total CPIs in bundle: {writer.count}")
+        if missing_z:
+            print(f"Skipped {len(missing_z) * per_z} combinations: no process for z={format_ranges(missing_z)}")
+        if cache is not None:
+            print(f"Cache hits: {cache.hits - cache_hits}, misses: {cache.misses - cache_misses}")
     
     return bundle_path
 
+def format_ranges(values: List[int]) -> str:
+    """Format sorted integers compactly, e.g. [1, 2, 3, 7] -> '1-3, 7'"""
+    ranges = []
+    for value in values:
+        if ranges and value == ranges[-1][1] + 1:
+            ranges[-1][1] = value
+        else:
+            ranges.append([value, value])
+    return ', '.join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
 def ensure_directory(directory):
     """Create directory if it doesn't exist"""
     if not os.path.exists(directory):
@@ -1,6 +1,12 @@
-from lark import Lark, Tree, Token
+from lark import Lark, Token
 import numpy as np
-import random
+import os
+import re
+import threading
+from functools import lru_cache
+from process_parser import parse_expression
+from cpi_array import CPIArray, NODE_TYPES, CHILD_KEYS, TASK, SEQUENCE, PARALLEL, CHOICE, NATURE
+from generation_stats import stage_clock
 
 # Grammar definition for process expressions
 # Defines the syntax for processes with XOR (^), parallel (||), and sequential (,) operations
@@ -28,68 +34,324 @@ PROCESS_GRAMMAR = r"""
 %ignore WS_INLINE
 """
 
+# Registry of compiled parsers shared by every entry point, keyed by (grammar, cache)
+_PARSERS = {}
+_PARSERS_LOCK = threading.Lock()
+
+def get_parser(grammar=PROCESS_GRAMMAR, cache=None):
+    """
+    Return the shared LALR parser for a grammar, compiling it only on first use.
+    
+    Args:
+        grammar (str): Grammar definition, defaults to PROCESS_GRAMMAR
+        cache (bool or str): Optional on-disk cache of the serialized LALR tables.
+            True uses Lark's default temporary location, a string is used as the file path.
+            Fresh interpreters (e.g. pool workers) then load the tables instead of recompiling.
+    
+    Returns:
+        Lark: Parser instance, safe to share between threads
+    """
+    key = (grammar, cache)
+    parser = _PARSERS.get(key)
+    if parser is None:
+        with _PARSERS_LOCK:
+            # Double-checked so concurrent first calls compile the grammar only once
+            parser = _PARSERS.get(key)
+            if parser is None:
+                parser = Lark(grammar, parser='lalr', cache=cache if cache is not None else False)
+                _PARSERS[key] = parser
+    return parser
+
 # Initialize the Lark parser with LALR parsing strategy
-PARSER = Lark(PROCESS_GRAMMAR, parser='lalr')
+PARSER = get_parser()
+
+# Runs of the whitespace ignored by PROCESS_GRAMMAR
+INLINE_WHITESPACE = re.compile(r'[ \t]+')
 
-def max_nested_xor(expression):
+# Maximum number of distinct process expressions kept in the parse cache
+PARSE_CACHE_SIZE = 4096
+
+def normalize_process(expression):
     """
-    Calculate the maximum depth of nested XOR operations in a process expression.
+    Normalize a process expression so equivalent spellings share a cache entry.
+    Inline whitespace (spaces and tabs, WS_INLINE) is ignored by the grammar, so runs
+    of it are collapsed; other whitespace such as newlines is kept, so both backends
+    still reject it.
     
     Args:
         expression (str): Process expression string
     
     Returns:
-        int: Maximum depth of nested XOR operations
+        str: Normalized expression
     """
-    tree = PARSER.parse(expression)
+    return INLINE_WHITESPACE.sub(' ', expression).strip(' \t')
+
+# Available parser backends: Lark's LALR parser or the dependency-free recursive-descent parser
+PARSER_BACKENDS = ('lark', 'descent')
+DEFAULT_PARSER_BACKEND = 'lark'
+
+def tree_to_node(tree):
+    """
+    Convert a Lark parse tree into the compact node structure of process_parser.
     
-    def _max_nested_xor(node):
-        # Base case: tokens or task nodes have depth 0
-        if isinstance(node, Token) or (isinstance(node, Tree) and node.data == 'task'):
-            return 0
-        
-        if isinstance(node, Tree):
-            if node.data == 'xor':
-                # For XOR nodes, take max of children depths and add 1
-                return max(_max_nested_xor(child) for child in node.children) + 1
-            elif node.data in ['sequential', 'parallel']:
-                # For sequential and parallel nodes, take max of children depths
-                return max(_max_nested_xor(child) for child in node.children)
+    Args:
+        tree (Tree): Tree produced by PARSER
+    
+    Returns:
+        tuple: ('task', name) or (kind, left, right) with kind in 'xor', 'parallel', 'sequential'
+    """
+    # Post-order conversion with an explicit stack, so deep trees never hit the recursion limit
+    converted = []
+    stack = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if isinstance(node, Token):
+            converted.append(('task', str(node)))
+        elif node.data == 'task':
+            converted.append(('task', str(node.children[0])))
+        elif node.data not in ('xor', 'parallel', 'sequential'):
+            raise ValueError(f"Unsupported parse tree node: {node.data}")
+        elif not expanded:
+            stack.append((node, True))
+            stack.append((node.children[1], False))
+            stack.append((node.children[0], False))
+        else:
+            right = converted.pop()
+            left = converted.pop()
+            converted.append((node.data, left, right))
+    return converted[0]
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_normalized(expression, backend):
+    if backend == 'lark':
+        return tree_to_node(PARSER.parse(expression))
+    if backend == 'descent':
+        return parse_expression(expression)
+    raise ValueError(f"Unknown parser backend {backend!r}, expected one of {PARSER_BACKENDS}")
+
+def parse_process(expression, backend=DEFAULT_PARSER_BACKEND):
+    """
+    Parse a process expression, reusing the tree of a previous parse when available.
+    The returned tree is shared between callers and must not be modified.
+    
+    Args:
+        expression (str): Process expression string
+        backend (str): Parser backend, one of PARSER_BACKENDS
+    
+    Returns:
+        tuple: Root of the compact tree, see tree_to_node
+    """
+    return _parse_normalized(normalize_process(expression), backend)
+
+def parse_cache_info():
+    """Return hits, misses, maxsize and currsize of the parse cache"""
+    return _parse_normalized.cache_info()
+
+def clear_parse_cache():
+    """Drop every cached parse tree and reset the hit/miss counters"""
+    _parse_normalized.cache_clear()
+
+# Node types treated as XOR operations, for parse trees and CPI dictionaries
+XOR_TYPES = ('xor', NODE_TYPES[CHOICE], NODE_TYPES[NATURE])
+
+# Child keys of each CPI dictionary node type, by type name
+CPI_CHILD_KEYS = {NODE_TYPES[code]: keys for code, keys in CHILD_KEYS.items()}
+
+def _describe_node(node):
+    """Return (type, children) of a compact node, Lark tree/token or CPI dictionary node"""
+    if isinstance(node, tuple):
+        return node[0], node[1:] if node[0] != 'task' else ()
+    if isinstance(node, dict):
+        keys = CPI_CHILD_KEYS.get(node['type'], ())
+        return node['type'], tuple(node[key] for key in keys)
+    if isinstance(node, Token) or node.data == 'task':
+        return 'task', ()
+    return node.data, tuple(node.children)
+
+def process_metrics(process, backend=DEFAULT_PARSER_BACKEND):
+    """
+    Compute the structural metrics of a process in a single traversal.
+    
+    Args:
+        process: Process expression string, Lark parse tree, compact parse tree
+            (see tree_to_node), CPI dictionary or CPIArray
+        backend (str): Parser backend used when process is a string
+    
+    Returns:
+        dict: 'max_nested_xor' (depth of nested XORs), 'max_independent_xor'
+        (XORs that can be executed concurrently), 'num_tasks', 'node_counts'
+        (number of nodes per type, with the type names of the input: parse tree kinds
+        or CPI types) and 'height' (edges from the root to the deepest task)
+    """
+    if isinstance(process, str):
+        process = parse_process(process, backend)
+    elif isinstance(process, CPIArray):
+        process = process.to_dict()
+    
+    node_counts = {}
+    # Post-order traversal with an explicit stack; values holds
+    # (nested XOR depth, independent XORs, height) of every finished subtree
+    values = []
+    stack = [(process, False)]
+    while stack:
+        node, expanded = stack.pop()
+        node_type, children = _describe_node(node)
+        if not children:
+            node_counts[node_type] = node_counts.get(node_type, 0) + 1
+            values.append((0, 0, 0))
+            continue
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children))
+            continue
         
-        return 0
+        node_counts[node_type] = node_counts.get(node_type, 0) + 1
+        child_values = values[-len(children):]
+        del values[-len(children):]
+        nested = max(value[0] for value in child_values)
+        height = max(value[2] for value in child_values) + 1
+        if node_type in XOR_TYPES:
+            # XORs nest one level deeper and count as at least one independent XOR
+            nested += 1
+            independent = max(1, max(value[1] for value in child_values))
+        else:
+            # Sequential and parallel branches execute their XORs independently
+            independent = sum(value[1] for value in child_values)
+        values.append((nested, independent, height))
+    
+    nested, independent, height = values[0]
+    return {
+        'max_nested_xor': nested,
+        'max_independent_xor': independent,
+        'num_tasks': node_counts.get('task', 0),
+        'node_counts': node_counts,
+        'height': height
+    }
+
+def max_nested_xor(expression, backend=DEFAULT_PARSER_BACKEND):
+    """
+    Calculate the maximum depth of nested XOR operations in a process expression.
+    
+    Args:
+        expression (str): Process expression string (or any input of process_metrics)
+        backend (str): Parser backend, one of PARSER_BACKENDS
     
-    return _max_nested_xor(tree)
+    Returns:
+        int: Maximum depth of nested XOR operations
+    """
+    return process_metrics(expression, backend)['max_nested_xor']
 
-def max_independent_xor(expression):
+def max_independent_xor(expression, backend=DEFAULT_PARSER_BACKEND):
     """
     Calculate the maximum number of independent XOR operations in a process expression.
     Independent XORs are those that can be executed concurrently.
     
     Args:
-        expression (str): Process expression string
+        expression (str): Process expression string (or any input of process_metrics)
+        backend (str): Parser backend, one of PARSER_BACKENDS
     
     Returns:
         int: Maximum number of independent XOR operations
     """
-    tree = PARSER.parse(expression)
+    return process_metrics(expression, backend)['max_independent_xor']
+
+class ProcessCorpus:
+    """
+    Indexed view of the generated_processes_full_{x}_{y}.txt files.
+    Each file is read once, on its first lookup, and a line-offset index is built
+    so that any process expression is then served without rescanning the file.
+    A file whose modification time or size changed since it was indexed is read again;
+    invalidate drops an index explicitly (write_process_file does so for CORPUS).
+    """
     
-    def _max_independent_xor(node):
-        # Base case: tokens or task nodes have 0 independent XORs
-        if isinstance(node, Token) or (isinstance(node, Tree) and node.data == 'task'):
-            return 0
+    def __init__(self, directory='generated_processes'):
+        """
+        Args:
+            directory (str): Folder holding the generated process files
+        """
+        self.directory = directory
+        self._files = {}
+        self._lock = threading.Lock()
+    
+    def filename(self, x, y):
+        """Return the path of the process file for the given x,y pair"""
+        return f'{self.directory}/generated_processes_full_{x}_{y}.txt'
+    
+    def invalidate(self, x=None, y=None):
+        """Drop the index of the file for x,y, or of every file when x and y are None"""
+        with self._lock:
+            if x is None and y is None:
+                self._files.clear()
+            else:
+                self._files.pop((x, y), None)
+    
+    def _index(self, x, y):
+        """Return (data, line start offsets, line end offsets) for a file, loading it if needed"""
+        filename = self.filename(x, y)
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            self.invalidate(x, y)
+            raise FileNotFoundError(f"The file {filename} does not exist.")
+        signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self._files.get((x, y))
+        if entry is None or entry[3] != signature:
+            try:
+                with open(filename, 'rb') as file:
+                    data = file.read()
+            except FileNotFoundError:
+                raise FileNotFoundError(f"The file {filename} does not exist.")
+            
+            starts = [0]
+            position = data.find(b'\n')
+            while position != -1:
+                starts.append(position + 1)
+                position = data.find(b'\n', position + 1)
+            # A trailing newline terminates the last line rather than starting a new one
+            if starts[-1] == len(data):
+                starts.pop()
+            ends = [start - 1 for start in starts[1:]] + [len(data)]
+            
+            entry = (data, starts, ends, signature)
+            with self._lock:
+                self._files[(x, y)] = entry
+        return entry[:3]
+    
+    def load_all(self, x_range=(1, 10), y_range=(1, 10)):
+        """Eagerly index every existing file in the given inclusive x,y ranges"""
+        for x in range(x_range[0], x_range[1] + 1):
+            for y in range(y_range[0], y_range[1] + 1):
+                try:
+                    self._index(x, y)
+                except FileNotFoundError:
+                    pass
+    
+    def num_processes(self, x, y):
+        """Return the number of lines (process expressions) in the file for x,y"""
+        return len(self._index(x, y)[1])
+    
+    def get(self, x, y, z):
+        """
+        Retrieve the process expression on line z of the file for x,y.
         
-        if isinstance(node, Tree):
-            if node.data == 'xor':
-                # For XOR nodes, take max of children counts and ensure at least 1
-                max_child = max(_max_independent_xor(child) for child in node.children)
-                return max(1, max_child)
-            elif node.data in ['sequential', 'parallel']:
-                # For sequential and parallel nodes, sum the children counts
-                return sum(_max_independent_xor(child) for child in node.children)
+        Args:
+            x, y: Parameters determining the file name
+            z: Line number to retrieve (1-based)
         
-        return 0
-    
-    return _max_independent_xor(tree)
+        Returns:
+            str: Process expression from the specified line
+            
+        Raises:
+            FileNotFoundError: If the specified file doesn't exist
+            ValueError: If the specified line number doesn't exist
+        """
+        data, starts, ends = self._index(x, y)
+        if not 1 <= z <= len(starts):
+            raise ValueError(f"Line {z} not found in the file. The file has fewer lines.")
+        return data[starts[z - 1]:ends[z - 1]].decode('utf-8').strip()
+
+# Shared corpus over the bundled generated_processes folder
+CORPUS = ProcessCorpus()
 
 def get_process_from_file(x, y, z):
     """
@@ -106,75 +368,71 @@ def get_process_from_file(x, y, z):
         FileNotFoundError: If the specified file doesn't exist
         ValueError: If the specified line number doesn't exist
     """
-    filename = f'generated_processes/generated_processes_full_{x}_{y}.txt'
-    try:
-        with open(filename, 'r') as file:
-            for i, line in enumerate(file, 1):
-                if i == z:
-                    return line.strip()
-        raise ValueError(f"Line {z} not found in the file. The file has fewer lines.")
-    except FileNotFoundError:
-        raise FileNotFoundError(f"The file {filename} does not exist.")
-
-def generate_vectors(num_vec, dim, mode="random"):
+    return CORPUS.get(x, y, z)
+
+def _selection_counts(indexes, dim):
+    """Count how many times each column index was drawn in every row of indexes"""
+    num_vec = indexes.shape[0]
+    flat = (np.arange(num_vec)[:, None] * dim + indexes).ravel()
+    return np.bincount(flat, minlength=num_vec * dim).reshape(num_vec, dim)
+
+def generate_vectors(num_vec, dim, mode="random", rng=None):
     """
     Generate impact vectors for tasks using different strategies.
+    All vectors are produced at once as a matrix; for the bagging modes each row draws
+    dim indexes with replacement, so an index drawn k times is divided k times.
     
     Args:
         num_vec (int): Number of vectors to generate
         dim (int): Dimension of each vector
         mode (str): Generation strategy ("random", "bagging_divide", "bagging_remove", etc.)
+        rng (np.random.Generator): Source of randomness, a freshly seeded generator if None
     
     Returns:
-        list: List of numpy arrays representing impact vectors
+        np.ndarray: Matrix of shape (num_vec, dim), one impact vector per row
     """
-    vectors = []
-    for _ in range(num_vec):
-        vector = np.random.random(dim)
-        if mode != "random":
-            # Generate random indices for vector modification
-            indexes = [random.randint(0, dim-1) for _ in range(dim)]
-            
-            # Apply different vector modification strategies based on mode
-            if mode == "bagging_divide":
-                # Divide selected elements by 10
-                for i in indexes:
-                    vector[i] /= 10
-            elif mode == "bagging_remove":
-                # Keep only selected elements
-                new_vector = np.zeros(dim)
-                for i in indexes:
-                    new_vector[i] = vector[i]
-                vector = new_vector
-            elif mode == "bagging_remove_divide":
-                # Keep and divide selected elements
-                new_vector = np.zeros(dim)
-                for i in indexes:
-                    new_vector[i] = vector[i] / 10
-                vector = new_vector
-            elif mode == "bagging_remove_reverse":
-                # Zero out selected elements
-                new_vector = vector.copy()
-                for i in indexes:
-                    new_vector[i] = 0
-                vector = new_vector
-            elif mode == "bagging_remove_reverse_divide":
-                # Zero out selected elements and divide some non-zero elements
-                new_vector = vector.copy()
-                for i in indexes:
-                    new_vector[i] = 0
-                non_zero_indexes = np.nonzero(new_vector)[0]
-                if len(non_zero_indexes) > 0:
-                    divide_indexes = [random.choice(non_zero_indexes) for _ in range(dim)]
-                    for i in divide_indexes:
-                        new_vector[i] /= 10
-                vector = new_vector
-        vectors.append(vector)
+    if rng is None:
+        rng = np.random.default_rng()
+    vectors = rng.random((num_vec, dim))
+    if mode == "random" or num_vec == 0:
+        return vectors
+    
+    # Number of times each element was selected by the random indexes of its row
+    counts = _selection_counts(rng.integers(0, dim, size=(num_vec, dim)), dim)
+    selected = counts > 0
+    
+    # Apply different vector modification strategies based on mode
+    if mode == "bagging_divide":
+        # Divide selected elements by 10 once per selection
+        vectors /= 10.0 ** counts
+    elif mode == "bagging_remove":
+        # Keep only selected elements
+        vectors = np.where(selected, vectors, 0.0)
+    elif mode == "bagging_remove_divide":
+        # Keep and divide selected elements
+        vectors = np.where(selected, vectors / 10, 0.0)
+    elif mode == "bagging_remove_reverse":
+        # Zero out selected elements
+        vectors = np.where(selected, 0.0, vectors)
+    elif mode == "bagging_remove_reverse_divide":
+        # Zero out selected elements and divide some non-zero elements
+        vectors = np.where(selected, 0.0, vectors)
+        non_zero = vectors != 0
+        num_non_zero = non_zero.sum(axis=1)
+        # Draw dim ranks per row uniformly among its non-zero elements, with replacement,
+        # and map each rank to its column (non-zero columns come first in a stable argsort)
+        ranks = (rng.random((num_vec, dim)) * num_non_zero[:, None]).astype(np.int64)
+        columns = np.take_along_axis(np.argsort(~non_zero, axis=1, kind='stable'), ranks, axis=1)
+        divide_counts = _selection_counts(columns, dim)
+        divide_counts[num_non_zero == 0] = 0
+        vectors /= 10.0 ** divide_counts
     return vectors
 
-def translate_to_cpi(process_str, choice_distribution, duration_interval, num_impacts, vector_generation_mode="random"):
+def translate_to_cpi(process_str, choice_distribution, duration_interval, num_impacts, vector_generation_mode="random",
+                     parser_backend=DEFAULT_PARSER_BACKEND, rng=None, as_array=False, stats=None):
     """
     Translates a process string into a CPI (Configurable Process Instance) dictionary.
+    The CPI is built as a CPIArray first; the nested dictionary is derived from it.
     
     Args:
         process_str (str): Process string following the grammar in PROCESS_GRAMMAR
@@ -182,95 +440,95 @@ def translate_to_cpi(process_str, choice_distribution, duration_interval, num_im
         duration_interval (tuple): (min, max) duration for tasks
         num_impacts (int): Number of impact keys per task
         vector_generation_mode (str): Mode for generating impact vectors
+        parser_backend (str): Parser backend, one of PARSER_BACKENDS
+        rng (np.random.Generator): Source of all randomness, a freshly seeded generator if None.
+            Passing a seeded generator makes the CPI reproducible.
+        as_array (bool): Return the struct-of-arrays CPIArray instead of the nested dictionary
+        stats (GenerationStats): Optional stats receiving the parse, vectors and build times
         
     Returns:
-        dict: CPI process dictionary with nested structure
+        dict: CPI process dictionary with nested structure (CPIArray if as_array)
     """
-    parser = Lark(PROCESS_GRAMMAR, parser='lalr')
-    tree = parser.parse(process_str)
-    
-    # Single global counter for unique IDs
-    id_counter = 0
-    
-    def count_tasks(node):
-        """Count total number of tasks in the process tree"""
-        if isinstance(node, Token) or (isinstance(node, Tree) and node.data == 'task'):
-            return 1
-        return sum(count_tasks(child) for child in node.children)
+    if rng is None:
+        rng = np.random.default_rng()
+    clock = stage_clock(stats)
+
+    tree = parse_process(process_str, parser_backend)
+    clock.lap('parse')
     
-    total_tasks = count_tasks(tree)
+    # Count total number of tasks in the process tree
+    total_tasks = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node[0] == 'task':
+            total_tasks += 1
+        else:
+            stack.extend(node[1:])
     
     # Generate impact vectors for all tasks
-    impact_vectors = generate_vectors(total_tasks, num_impacts, mode=vector_generation_mode)
-    task_counter = 0  # Counter to assign impact vectors to tasks
+    impact_vectors = generate_vectors(total_tasks, num_impacts, mode=vector_generation_mode, rng=rng)
+    clock.lap('vectors')
     
-    def process_node(node):
-        """
-        Recursively process nodes in the parse tree to build CPI dictionary
-        """
-        nonlocal id_counter, task_counter
+    # Node arrays in pre-order: the position of a node is its unique ID
+    node_type = []
+    children = []
+    probability = []
+    task_nodes = []
+    durations = []
+    
+    # Process nodes of the compact parse tree with an explicit stack to fill the CPI arrays.
+    # Entries are (node, parent, side); a None node marks the end of the subtree of XOR node
+    # `parent`, where a nature probability is drawn, keeping the draw order of a recursive walk.
+    stack = [(tree, -1, 0)]
+    while stack:
+        node, parent, side = stack.pop()
+        if node is None:
+            # Add probability for nature nodes
+            if node_type[parent] == NATURE:
+                probability[parent] = float(rng.random())
+            continue
         
-        if isinstance(node, Token):
-            # Create task node with random duration and impacts
-            current_id = id_counter
-            id_counter += 1
-            
-            impact_vector = impact_vectors[task_counter]
-            task_counter += 1
-            impacts = {f"impact_{i+1}": float(val) for i, val in enumerate(impact_vector)}
-            
-            return {
-                "type": "task",
-                "id": current_id,
-                "duration": random.randint(duration_interval[0], duration_interval[1]),
-                "impacts": impacts
-            }
-            
-        if isinstance(node, Tree):
-            if node.data == 'task':
-                return process_node(node.children[0])
-                
-            elif node.data == 'sequential':
-                # Create sequence node with head and tail
-                current_id = id_counter
-                id_counter += 1
-                return {
-                    "type": "sequence",
-                    "id": current_id,
-                    "head": process_node(node.children[0]),
-                    "tail": process_node(node.children[1])
-                }
-                
-            elif node.data == 'parallel':
-                # Create parallel node with first and second splits
-                current_id = id_counter
-                id_counter += 1
-                return {
-                    "type": "parallel",
-                    "id": current_id,
-                    "first_split": process_node(node.children[0]),
-                    "second_split": process_node(node.children[1])
-                }
-                
-            elif node.data == 'xor':
-                # Create either choice or nature node based on probability
-                is_choice = random.random() < choice_distribution
-                node_type = 'choice' if is_choice else 'nature'
-                
-                current_id = id_counter
-                id_counter += 1
-                
-                result = {
-                    "type": node_type,
-                    "id": current_id,
-                    "true": process_node(node.children[0]),
-                    "false": process_node(node.children[1])
-                }
-                
-                # Add probability for nature nodes
-                if not is_choice:
-                    result["probability"] = random.random()
-                    
-                return result
-    
-    return process_node(tree)
\ No newline at end of file
+        current_id = len(node_type)
+        if parent >= 0:
+            children[parent][side] = current_id
+        children.append([-1, -1])
+        probability.append(np.nan)
+        
+        if node[0] == 'task':
+            # Create task node with random duration; impacts are the task's row of impact_vectors
+            node_type.append(TASK)
+            task_nodes.append(current_id)
+            durations.append(int(rng.integers(duration_interval[0], duration_interval[1] + 1)))
+            continue
+        
+        if node[0] == 'sequential':
+            # Sequence node with head and tail
+            node_type.append(SEQUENCE)
+        elif node[0] == 'parallel':
+            # Parallel node with first and second splits
+            node_type.append(PARALLEL)
+        elif node[0] == 'xor':
+            # Create either choice or nature node based on probability
+            is_choice = rng.random() < choice_distribution
+            node_type.append(CHOICE if is_choice else NATURE)
+            stack.append((None, current_id, 0))
+        
+        # Second child pushed first so the first subtree is numbered first
+        stack.append((node[2], current_id, 1))
+        stack.append((node[1], current_id, 0))
+    
+    cpi = CPIArray(
+        node_type=node_type,
+        ids=np.arange(len(node_type)),
+        children=children,
+        probability=probability,
+        task_nodes=task_nodes,
+        duration=durations,
+        impacts=impact_vectors,
+        impact_names=[f"impact_{i+1}" for i in range(num_impacts)]
+    )
+    if not as_array:
+        cpi = cpi.to_dict()
+    clock.lap('build')
+    return cpi
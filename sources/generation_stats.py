@@ -0,0 +1,129 @@
+import json
+import contextlib
+import time
+from typing import Dict, Optional
+
+# Instrumented stages of CPI generation, in pipeline order
+STAGES = ('lookup', 'parse', 'vectors', 'build', 'encode', 'compress')
+
+class _StageTimer:
+    """Context manager adding the wall and CPU time of its block to one stage"""
+
+    __slots__ = ('stats', 'name', 'count', 'wall', 'cpu')
+
+    def __init__(self, stats, name, count):
+        self.stats = stats
+        self.name = name
+        self.count = count
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stats.add(self.name, time.perf_counter() - self.wall, time.process_time() - self.cpu, self.count)
+
+class _StageClock:
+    """Times consecutive stages: each lap closes the current stage and starts the next"""
+
+    __slots__ = ('stats', 'wall', 'cpu')
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def lap(self, name, count=1):
+        wall, cpu = time.perf_counter(), time.process_time()
+        self.stats.add(name, wall - self.wall, cpu - self.cpu, count)
+        self.wall, self.cpu = wall, cpu
+
+class _NoClock:
+    """Clock of uninstrumented calls"""
+
+    __slots__ = ()
+
+    def lap(self, name, count=1):
+        pass
+
+class GenerationStats:
+    """
+    Per-stage wall time (perf_counter), CPU time (process_time) and call counts of CPI
+    generation. Pass one as stats= to translate_to_cpi, generate_cpi_bundle or
+    generate_cpi_files_parametrized; each timed block costs two clock reads on entry and
+    exit, cheap enough to leave on. Stats from several bundles or worker processes are
+    combined with merge.
+    Stages (see STAGES):
+        lookup    reading process strings from the corpus
+        parse     parsing process strings
+        vectors   drawing impact vectors
+        build     drawing the remaining values and assembling the CPI
+        encode    serializing CPIs (JSON text or columnar bytes)
+        compress  gzip compression and writing blocks to disk
+    """
+
+    def __init__(self):
+        self.wall = dict.fromkeys(STAGES, 0.0)
+        self.cpu = dict.fromkeys(STAGES, 0.0)
+        self.counts = dict.fromkeys(STAGES, 0)
+
+    def stage(self, name: str, count: int = 1) -> _StageTimer:
+        """Time a block as stage name, e.g. `with stats.stage('parse'): ...`"""
+        return _StageTimer(self, name, count)
+
+    def clock(self) -> _StageClock:
+        """Start timing consecutive stages, e.g. `clock = stats.clock(); ...; clock.lap('parse')`"""
+        return _StageClock(self)
+
+    def add(self, name: str, wall: float, cpu: float, count: int = 1) -> None:
+        """Add measured time to a stage"""
+        self.wall[name] = self.wall.get(name, 0.0) + wall
+        self.cpu[name] = self.cpu.get(name, 0.0) + cpu
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    def merge(self, other: 'GenerationStats') -> 'GenerationStats':
+        """Add the totals of other (stats or a to_dict result) to these stats and return self"""
+        if isinstance(other, dict):
+            other = GenerationStats.from_dict(other)
+        for name in other.wall:
+            self.add(name, other.wall[name], other.cpu[name], other.counts[name])
+        return self
+
+    def to_dict(self) -> Dict:
+        """Return {stage: {'wall': seconds, 'cpu': seconds, 'count': calls}}"""
+        return {name: {'wall': self.wall[name], 'cpu': self.cpu[name], 'count': self.counts[name]}
+                for name in self.wall}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'GenerationStats':
+        """Rebuild stats from a to_dict result"""
+        stats = cls()
+        for name, values in data.items():
+            stats.add(name, values['wall'], values['cpu'], values['count'])
+        return stats
+
+    def dump(self, path: str, extra: Optional[Dict] = None) -> None:
+        """Write the stats as JSON, with optional extra top-level fields"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dict(extra or {}, stages=self.to_dict()), f, indent=2)
+
+    def __str__(self):
+        total = sum(self.wall.values()) or 1.0
+        lines = [f"{'stage':<10}{'wall s':>10}{'cpu s':>10}{'share':>8}{'count':>10}"]
+        for name in self.wall:
+            lines.append(f"{name:<10}{self.wall[name]:>10.3f}{self.cpu[name]:>10.3f}"
+                         f"{self.wall[name] / total:>8.1%}{self.counts[name]:>10}")
+        return '\n'.join(lines)
+
+# Shared no-op timers for uninstrumented calls
+_NO_STAGE = contextlib.nullcontext()
+_NO_CLOCK = _NoClock()
+
+def timed_stage(stats: Optional[GenerationStats], name: str, count: int = 1):
+    """Return a timer for stage name of stats, or a no-op context when stats is None"""
+    return stats.stage(name, count) if stats is not None else _NO_STAGE
+
+def stage_clock(stats: Optional[GenerationStats]):
+    """Return a clock for consecutive stages of stats, or a no-op clock when stats is None"""
+    return stats.clock() if stats is not None else _NO_CLOCK
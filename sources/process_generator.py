@@ -0,0 +1,186 @@
+import os
+import numpy as np
+from typing import Iterator, Optional
+from generated_processes import process_metrics, CORPUS
+
+# Operator of each compact node kind, as written in the process files
+OPERATORS = {'xor': '^', 'parallel': '||', 'sequential': ','}
+
+def _check_targets(x: int, y: int) -> None:
+    """Raise ValueError unless some process has max_nested_xor == x and max_independent_xor == y"""
+    if x < 0 or y < 0 or (x == 0) != (y == 0):
+        raise ValueError(f"No process has max_nested_xor={x} and max_independent_xor={y}: "
+                         f"both must be 0 or both at least 1")
+
+def _geometric_target(rng, limit: int, depth_decay: float) -> int:
+    """Draw a nesting target in 1..limit from a geometric distribution"""
+    return int(min(limit, rng.geometric(depth_decay)))
+
+def _build_nodes(x: int, y: int, rng, task_probability: float, padding_probability: float,
+                 xor_probability: float, depth_decay: float) -> list:
+    """
+    Construct a random process tree with max_nested_xor == x and max_independent_xor == y.
+    Every hole of the tree carries its own (nested, independent) target and is filled so
+    that the targets of its children combine exactly into it:
+        XOR:            nested = max(children) + 1, independent = max(1, max(children))
+        sequence/par.:  nested = max(children),     independent = sum(children)
+    Returns the nodes in creation order as [kind, left, right] lists, root first;
+    tasks are ['task', -1, -1].
+    """
+    nodes = []
+    holes = [(x, y, -1, 0)]  # (nested target, independent target, parent node, child side)
+    while holes:
+        nested, independent, parent, side = holes.pop()
+        index = len(nodes)
+        if parent >= 0:
+            nodes[parent][side + 1] = index
+
+        if nested == 0:
+            # Task-only region: a task, or a sequence/parallel of two task-only regions
+            if rng.random() < task_probability:
+                nodes.append(['task', -1, -1])
+            else:
+                nodes.append(['sequential' if rng.random() < 0.5 else 'parallel', -1, -1])
+                holes.append((0, 0, index, 1))
+                holes.append((0, 0, index, 0))
+            continue
+
+        kind = 'sequential' if rng.random() < 0.5 else 'parallel'
+        if rng.random() < padding_probability:
+            # Pad the region with a task-only sibling; the targets are unchanged
+            children = [(nested, independent), (0, 0)]
+        elif independent == 1 or (nested > 1 and rng.random() < xor_probability):
+            kind = 'xor'
+            if independent == 1:
+                # One branch continues the nesting, the other is task-only or a single XOR chain
+                other = (0, 0) if nested == 1 or rng.random() < 0.5 else \
+                    (_geometric_target(rng, nested - 1, depth_decay), 1)
+                children = [(nested - 1, 1), other]
+            elif rng.random() < 0.5:
+                # One branch carries both targets, the other is task-only
+                children = [(nested - 1, independent), (0, 0)]
+            else:
+                # One branch continues the nesting, the other carries the independent XORs
+                children = [(nested - 1, 1), (_geometric_target(rng, nested - 1, depth_decay), independent)]
+        else:
+            # Split the independent XORs between the branches; one keeps the nesting target
+            first = int(rng.integers(1, independent))
+            children = [(nested, first), (_geometric_target(rng, nested, depth_decay), independent - first)]
+
+        if rng.random() < 0.5:
+            children.reverse()
+        nodes.append([kind, -1, -1])
+        holes.append((children[1][0], children[1][1], index, 1))
+        holes.append((children[0][0], children[0][1], index, 0))
+    return nodes
+
+def _to_expression(nodes: list) -> str:
+    """Write nodes in the process file syntax, numbering tasks T1, T2, ... left to right"""
+    parts = []
+    task_counter = 0
+    stack = [0]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+        kind, left, right = nodes[item]
+        if kind == 'task':
+            task_counter += 1
+            parts.append(f"T{task_counter}")
+        else:
+            stack.extend((')', right, f" {OPERATORS[kind]} ", left))
+            parts.append('(')
+    return ''.join(parts)
+
+def generate_process(
+    x: int,
+    y: int,
+    rng: Optional[np.random.Generator] = None,
+    task_probability: float = 0.7,
+    padding_probability: float = 0.3,
+    xor_probability: float = 0.5,
+    depth_decay: float = 0.5,
+    validate: bool = False
+) -> str:
+    """
+    Construct a random process expression with exactly max_nested_xor == x and
+    max_independent_xor == y, without rejection sampling. The expression size grows
+    linearly with x + y, so targets in the hundreds stay cheap.
+
+    Args:
+        x: Required maximum depth of nested XORs
+        y: Required maximum number of independent XORs
+        rng: Source of randomness, a freshly seeded generator if None
+        task_probability: Probability that a task-only region is a single task, in (0.5, 1]
+            (otherwise it splits in two, so regions have p / (2p - 1) tasks on average;
+            the expected size is infinite for p <= 0.5)
+        padding_probability: Probability of padding a region with a task-only sibling, below 1
+        xor_probability: Probability of opening a region with an XOR when a split is also possible
+        depth_decay: Success probability of the geometric distribution giving the nesting
+            target of side branches (capped by the region's own target)
+        validate: Check the result with process_metrics (slower)
+
+    Returns:
+        str: Process expression in the syntax of the generated_processes files
+
+    Raises:
+        ValueError: If the targets are infeasible (exactly one of x, y is 0, or one is negative),
+            or a probability would make the expected size infinite
+    """
+    _check_targets(x, y)
+    if not 0.5 < task_probability <= 1:
+        raise ValueError(f"task_probability must be in (0.5, 1], got {task_probability}")
+    if not 0 <= padding_probability < 1:
+        raise ValueError(f"padding_probability must be in [0, 1), got {padding_probability}")
+    if rng is None:
+        rng = np.random.default_rng()
+    expression = _to_expression(_build_nodes(x, y, rng, task_probability, padding_probability,
+                                             xor_probability, depth_decay))
+    if validate:
+        metrics = process_metrics(expression, backend='descent')
+        if (metrics['max_nested_xor'], metrics['max_independent_xor']) != (x, y):
+            raise AssertionError(f"Generated process misses the targets ({x}, {y}): {expression}")
+    return expression
+
+def iter_processes(x: int, y: int, count: int, seed: Optional[int] = None, **kwargs) -> Iterator[str]:
+    """
+    Lazily generate count process expressions for the same x,y targets.
+
+    Args:
+        x, y: Targets, see generate_process
+        count: Number of expressions
+        seed: Optional seed making the sequence reproducible
+        **kwargs: Further generate_process options
+
+    Yields:
+        str: Process expressions
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        yield generate_process(x, y, rng=rng, **kwargs)
+
+def write_process_file(
+    x: int,
+    y: int,
+    count: int,
+    directory: str = 'generated_processes',
+    seed: Optional[int] = None,
+    **kwargs
+) -> str:
+    """
+    Write a generated_processes_full_{x}_{y}.txt file with count generated expressions,
+    one per line, readable by ProcessCorpus and get_process_from_file. The shared
+    CORPUS drops its index of the file, so later lookups see the new expressions.
+
+    Returns:
+        str: Path of the written file
+    """
+    os.makedirs(directory, exist_ok=True)
+    filename = f'{directory}/generated_processes_full_{x}_{y}.txt'
+    with open(filename, 'w') as file:
+        for i, expression in enumerate(iter_processes(x, y, count, seed, **kwargs)):
+            file.write(expression if i == 0 else '\n' + expression)
+    if os.path.abspath(directory) == os.path.abspath(CORPUS.directory):
+        CORPUS.invalidate(x, y)
+    return filename
@@ -0,0 +1,123 @@
+import re
+
+# Dependency-free parser for the process expression language of PROCESS_GRAMMAR.
+# It builds compact nodes directly instead of Lark Tree/Token objects:
+#   ('task', name)                     for a basic process
+#   (kind, left, right)                for kind in 'xor', 'parallel', 'sequential'
+# Operators are binary and left associative, with ',' binding tighter than '||'
+# and '||' binding tighter than '^', exactly as in PROCESS_GRAMMAR.
+
+# One alternative per token kind; anything else is reported as an error
+TOKEN_PATTERN = re.compile(r"""
+    (?P<ws>[ \t]+)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>\|\||\^|,)
+  | (?P<lpar>\()
+  | (?P<rpar>\))
+  | (?P<error>.)
+""", re.VERBOSE | re.DOTALL)
+
+# Grammar rule produced by each binary operator
+OPERATOR_KINDS = {'^': 'xor', '||': 'parallel', ',': 'sequential'}
+
+
+class ProcessSyntaxError(ValueError):
+    """Raised when an expression does not follow the process grammar"""
+
+
+def tokenize(expression):
+    """
+    Split a process expression into (kind, text, position) tokens.
+
+    Args:
+        expression (str): Process expression string
+
+    Returns:
+        list: Tokens without whitespace, terminated by an ('end', '', len(expression)) token
+
+    Raises:
+        ProcessSyntaxError: If the expression contains a character outside the language
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(expression):
+        kind = match.lastgroup
+        if kind == 'ws':
+            continue
+        if kind == 'error':
+            raise ProcessSyntaxError(f"Unexpected character {match.group()!r} at position {match.start()}")
+        tokens.append((kind, match.group(), match.start()))
+    tokens.append(('end', '', len(expression)))
+    return tokens
+
+
+# Binding strength of each operator, higher binds tighter
+PRECEDENCE = {'^': 1, '||': 2, ',': 3}
+
+
+def _parse_tokens(tokens):
+    """
+    Parse a token list with explicit operand and operator stacks.
+    This is the descent over xor -> parallel -> sequential -> region unrolled into loops,
+    so arbitrarily deep nesting never hits the interpreter's recursion limit.
+    """
+    operands = []
+    operators = []
+    open_parens = 0
+
+    def reduce():
+        right = operands.pop()
+        left = operands.pop()
+        operands.append((OPERATOR_KINDS[operators.pop()], left, right))
+
+    def error(expected, token):
+        kind, text, position = token
+        found = repr(text) if kind != 'end' else 'end of input'
+        raise ProcessSyntaxError(f"Expected {expected} but found {found} at position {position}")
+
+    expect_operand = True
+    for token in tokens:
+        kind, text, _ = token
+        if expect_operand:
+            if kind == 'name':
+                operands.append(('task', text))
+                expect_operand = False
+            elif kind == 'lpar':
+                operators.append('(')
+                open_parens += 1
+            else:
+                error("a task name or '('", token)
+        elif kind == 'op':
+            # Left associativity: reduce pending operators that bind at least as tightly
+            while operators and operators[-1] != '(' and PRECEDENCE[operators[-1]] >= PRECEDENCE[text]:
+                reduce()
+            operators.append(text)
+            expect_operand = True
+        elif kind == 'rpar' and open_parens:
+            while operators[-1] != '(':
+                reduce()
+            operators.pop()
+            open_parens -= 1
+        elif kind == 'end' and not open_parens:
+            while operators:
+                reduce()
+            return operands[0]
+        elif open_parens:
+            error("')'", token)
+        else:
+            error("an operator or end of input", token)
+
+
+def parse_expression(expression):
+    """
+    Parse a process expression into compact nodes without going through Lark.
+
+    Args:
+        expression (str): Process expression string
+
+    Returns:
+        tuple: Root node of the compact tree
+
+    Raises:
+        ProcessSyntaxError: If the expression is not a valid process
+    """
+    return _parse_tokens(tokenize(expression))
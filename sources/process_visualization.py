@@ -1,24 +1,33 @@
+from cpi_array import CPIArray
+
 def process_to_dot(region_dict):
     """
     Converts a hierarchical process region dictionary into DOT graph visualization format.
     
     Args:
         region_dict (dict): A nested dictionary representing the process structure,
-                           where each region has a type and associated data
+                           where each region has a type and associated data.
+                           A CPIArray is accepted as well.
     
     Returns:
         str: A DOT graph representation of the process as a string
     """
+    if isinstance(region_dict, CPIArray):
+        region_dict = region_dict.to_dict()
+    
     # Initialize DOT graph with default node shape as box
     dot_lines = ['digraph G {', '    node [shape=box];']
     
     def add_node(region):
         """
-        Recursively processes a region and its children, adding appropriate nodes and edges
+        Processes a region, adding its node and the edges to its children
         to the DOT graph representation.
         
         Args:
             region (dict): Dictionary containing region information including type and connections
+        
+        Returns:
+            list: Child regions still to be processed, in order
         """
         # Create unique node identifier combining type and ID
         node_id = f"{region['type']}{region['id']}"
@@ -47,9 +56,8 @@ def process_to_dot(region_dict):
             tail_id = f"{region['tail']['type']}{region['tail']['id']}"
             dot_lines.append(f'    {node_id} -> {head_id} [label="head"];')
             dot_lines.append(f'    {node_id} -> {tail_id} [label="tail"];')
-            # Recursively process head and tail regions
-            add_node(region['head'])
-            add_node(region['tail'])
+            # Head and tail regions are processed next
+            return [region['head'], region['tail']]
             
         elif region['type'] == 'parallel':
             # Parallel regions have first and second split connections
@@ -57,9 +65,8 @@ def process_to_dot(region_dict):
             second_id = f"{region['second_split']['type']}{region['second_split']['id']}"
             dot_lines.append(f'    {node_id} -> {first_id} [label="first"];')
             dot_lines.append(f'    {node_id} -> {second_id} [label="second"];')
-            # Recursively process both split regions
-            add_node(region['first_split'])
-            add_node(region['second_split'])
+            # Both split regions are processed next
+            return [region['first_split'], region['second_split']]
             
         elif region['type'] in ['choice', 'nature']:
             # Choice and nature regions have true and false branch connections
@@ -67,12 +74,16 @@ def process_to_dot(region_dict):
             false_id = f"{region['false']['type']}{region['false']['id']}"
             dot_lines.append(f'    {node_id} -> {true_id} [label="true"];')
             dot_lines.append(f'    {node_id} -> {false_id} [label="false"];')
-            # Recursively process both branches
-            add_node(region['true'])
-            add_node(region['false'])
+            # Both branches are processed next
+            return [region['true'], region['false']]
+        
+        return []
     
-    # Start processing from the root region
-    add_node(region_dict)
+    # Start processing from the root region; regions are visited depth-first, first child
+    # first, with an explicit stack so deep processes never hit the recursion limit
+    stack = [region_dict]
+    while stack:
+        stack.extend(reversed(add_node(stack.pop())))
     # Close the DOT graph
     dot_lines.append('}')
     # Join all lines into a single string